@@ -7,12 +7,16 @@
 import logging
 import os
 
+from concurrent.futures import ThreadPoolExecutor
+
 from mkdocs.config.defaults import MkDocsConfig
 from mkdocs.structure.files import File, Files
 from mkdocs.structure.pages import Page
 
 log = logging.getLogger(f"mkdocs")
-rule_redirects = []
+
+# Redirects for the current build, keyed by the path of the redirect page relative to the site directory.
+rule_redirects: dict[str, str] = {}
 
 RULE_REDIRECT_TEMPLATE = """
 <!doctype html>
@@ -35,6 +39,11 @@ Redirecting...
 # Hooks
 #
 
+def on_pre_build(config: MkDocsConfig):
+    '''Hook on_pre_build event.'''
+
+    rule_redirects.clear()
+
 def on_page_markdown(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
     '''Hook on_page_markdown event.'''
 
@@ -46,8 +55,6 @@ def on_post_build(config: MkDocsConfig):
 
     return generate_rule_redirects(config)
 
-
-
 #
 # Supporting functions
 #
@@ -62,43 +69,40 @@ def map_rule_redirects(page: Page):
         for alias in aliases:
           if alias != None:
             log.warning(f"Mapping rule redirect: {alias} -> {rule}")
-            rule_redirects.append(
-                {
-                  "url": page.url,
-                  "rule": rule,
-                  "alias": alias
-                }
-            )
+            rule_redirects[f"{page.url.replace(rule, alias)}/index.html"] = f"../{rule}/"
 
 def generate_rule_redirects(config: MkDocsConfig):
     '''Create redirects for rules.'''
 
-    for redirect in rule_redirects:
-        url = redirect['url']
-        rule = redirect['rule']
-        alias = redirect['alias']
+    site_dir = config["site_dir"]
 
-        old_path = f"{url.replace(rule, alias)}/index.html"
-        new_path = f"../{rule}/"
+    # Create each directory once before writing redirects concurrently.
+    for old_dir in set(os.path.dirname(old_path) for old_path in rule_redirects.keys()):
+        os.makedirs(os.path.join(site_dir, old_dir), exist_ok=True)
 
-        write_redirect_html(config["site_dir"], old_path, new_path)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        written = sum(executor.map(lambda redirect: write_redirect_html(site_dir, *redirect), rule_redirects.items()))
 
+    log.info(f"Rule redirects: {written} written, {len(rule_redirects) - written} unchanged.")
 
-def write_redirect_html(site_dir: str, old_path: str, new_path: str):
-    '''Add redirects.'''
+def write_redirect_html(site_dir: str, old_path: str, new_path: str) -> bool:
+    '''Add a redirect, returning False when the existing redirect is unchanged.'''
 
-    # Determine all relevant paths.
     old_path_abs = os.path.join(site_dir, old_path)
-    old_dir = os.path.dirname(old_path)
-    old_dir_abs = os.path.dirname(old_path_abs)
+    content = RULE_REDIRECT_TEMPLATE.format(url=new_path)
+
+    # Skip writing redirects that already exist from a previous build.
+    try:
+        with open(old_path_abs, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return False
 
-    # Create parent directories if they don't exist.
-    if not os.path.exists(old_dir_abs):
-        log.debug(f"Creating directory '{old_dir}'")
-        os.makedirs(old_dir_abs)
+    except OSError:
+        pass
 
     # Write the HTML redirect file.
     log.debug(f"Creating redirect: '{old_path}' -> '{new_path}'")
-    content = RULE_REDIRECT_TEMPLATE.format(url=new_path)
     with open(old_path_abs, "w", encoding="utf-8") as f:
         f.write(content)
+
+    return True
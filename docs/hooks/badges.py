@@ -0,0 +1,151 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# This file implements badges shared by docs hooks.
+# Relative links and rendered badges only depend on the directory of the page, so they are cached for each build.
+# This module is imported by hooks rather than registered as one, since MkDocs loads each hook as a separate module.
+# The shortcodes hook clears the caches before each build and logs statistics after it.
+
+import logging
+import os
+
+from collections import OrderedDict
+
+from mkdocs.structure.files import File, Files
+from mkdocs.structure.pages import Page
+
+log = logging.getLogger(f"mkdocs")
+
+# The maximum number of entries kept in each cache.
+MAX_ENTRIES = 4096
+
+# Relative URIs keyed by the page directory and the target path, and rendered badges keyed by kind, text, and page directory.
+# Both are cleared before each build, because the files of the site can change between builds.
+relative_uris: OrderedDict[tuple, str] = OrderedDict()
+relative_uris_stats = { 'hits': 0, 'misses': 0 }
+badges: OrderedDict[tuple, str] = OrderedDict()
+badges_stats = { 'hits': 0, 'misses': 0 }
+
+def clear():
+    '''Clear cached links and badges before a build.'''
+
+    for cache, stats in [(relative_uris, relative_uris_stats), (badges, badges_stats)]:
+        cache.clear()
+        stats['hits'] = 0
+        stats['misses'] = 0
+
+def badge(icon: str, text: str = "") -> str:
+    '''Create span block for a badge.'''
+
+    classes = "badge"
+    return "".join([
+        f"<span class=\"{classes}\">",
+        *([f"<span class=\"badge__icon\">{icon}</span>"] if icon else []),
+        *([f"<span class=\"badge__text\">{text}</span>"] if text else []),
+        f"</span>",
+    ])
+
+def badge_for_version(text: str, page: Page, files: Files) -> str:
+    '''Create badge for minimum version.'''
+
+    # Get place in changelog, linking to the page for the minor release when the change log is split.
+    version = text
+    anchor = version.replace('.', '')
+    path = f"changelog.md#{anchor}"
+    parts = version.lstrip('v').split('.')
+    if len(parts) > 2 and files.get_file_from_path(changelog_path(parts[0], parts[1])) != None:
+        path = f"{changelog_path(parts[0], parts[1])}#{anchor}"
+
+    def create() -> str:
+        icon = "octicons-milestone-24"
+        href = relative_uri(path, page, files)
+        return badge(
+            icon = f"[:{icon}:]({href} 'Minimum version')",
+            text = f"[{text}]({href})"
+        )
+
+    return _get_or_add(badges, badges_stats, ('version', text, _page_key(path, page)), create)
+
+def badge_for_applies_to_rule(text: str, page: Page, files: Files) -> str:
+    '''Create a badge for linking to a related rule.'''
+
+    path = f"en/rules/{text}.md"
+
+    def create() -> str:
+        icon = "octicons-link-24"
+        href = relative_uri(path, page, files)
+        return badge(
+            icon = f"[:{icon}:]({href} 'Applies to rule')",
+            text = f"[{text}]({href})"
+        )
+
+    return _get_or_add(badges, badges_stats, ('rule', text, _page_key(path, page)), create)
+
+def badge_for_configuration(text: str) -> str:
+    '''Create a badge for linking to a configuration setting.'''
+
+    def create() -> str:
+        config_type = text.split(' ')[0]
+        config_value = text.split(' ')[1]
+        path = ""
+        if config_type == "rule":
+            path = f"../../setup/configuring-rules.md#{config_value.lower()}"
+
+        if config_type == "expand":
+            path = f"../../setup/configuring-expansion.md#{config_value.lower()}"
+
+        icon = "octicons-gear-24"
+        href = path
+        return badge(
+            icon = f"[:{icon}:]({href} 'Applies to configuration setting')",
+            text = f"[{config_value}]({href})"
+        )
+
+    return _get_or_add(badges, badges_stats, ('configuration', text, None), create)
+
+def changelog_path(major: str, minor: str) -> str:
+    '''Get the path of the change log page for a minor release.'''
+
+    return f"changelog-v{major}.{minor}.md"
+
+def relative_uri(path: str, page: Page, files: Files) -> str:
+    '''Get relative URI for a file including anchor.'''
+
+    def create() -> str:
+        target, anchor, *_ = f"{path}#".split("#")
+        target = _relative_path(files.get_file_from_path(target), page)
+        return "#".join([target, anchor]) if anchor else target
+
+    return _get_or_add(relative_uris, relative_uris_stats, (_page_key(path, page), path), create)
+
+def _relative_path(file: File, page: Page) -> str:
+    '''Get relative source path for a file to a page.'''
+
+    path = os.path.relpath(file.src_uri, page.file.src_uri)
+    return os.path.sep.join(path.split(os.path.sep)[1:])
+
+def _page_key(path: str, page: Page) -> str:
+    '''Get the part of a page that a relative path depends on, which is the directory unless the path is the page itself.'''
+
+    src_uri = page.file.src_uri
+    if path.split("#")[0] == src_uri:
+        return src_uri
+
+    return os.path.dirname(src_uri)
+
+def _get_or_add(cache: OrderedDict, stats: dict[str, int], key: tuple, create) -> str:
+    '''Get a cached value or create it, removing the least recently used entry when the cache is full.'''
+
+    value = cache.get(key, None)
+    if value != None:
+        cache.move_to_end(key)
+        stats['hits'] += 1
+        return value
+
+    stats['misses'] += 1
+    value = cache[key] = create()
+    if len(cache) > MAX_ENTRIES:
+        cache.popitem(last=False)
+
+    return value
@@ -0,0 +1,461 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# This file implements benchmarks for docs hooks.
+# It is not registered as a hook and is run manually from the repository root:
+# python docs/hooks/benchmark.py [--scales 1000,10000,50000] [--output out/benchmark/results-docs.md]
+#
+# Each scenario is run over the real docs/en/rules corpus and synthetic corpora of the requested sizes.
+# Synthetic corpora repeat real rule pages under new names, so per page cost should stay flat as the size grows.
+#
+# Reference results are kept in docs/benchmark/results-docs.md. Write results with --output and compare them with it,
+# updating the reference results when a change to the hooks or the lexer is expected to change them.
+
+import argparse
+import glob
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from mkdocs.utils import meta
+
+import metadata
+import old_hooks
+import patterns
+import samples
+import shortcodes
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SITE_URL = "https://azure.github.io/PSRule.Rules.Azure"
+REPO_URL = "https://github.com/Azure/PSRule.Rules.Azure/"
+
+#
+# Stubs
+#
+
+class StubTheme:
+    '''Stub for the theme of MkDocsConfig.'''
+
+    locale = "en"
+
+class StubConfig:
+    '''Stub for MkDocsConfig with the properties used by hooks.'''
+
+    def __init__(self, docs_dir: str):
+        self.docs_dir = docs_dir
+        self.repo_url = REPO_URL
+        self.theme = StubTheme()
+
+class StubFile:
+    '''Stub for File with the properties used by hooks.'''
+
+    def __init__(self, src_path: str, abs_src_path: str = None, abs_dest_path: str = None):
+        self.src_path = src_path
+        self.src_uri = src_path
+        self.abs_src_path = abs_src_path
+        self.abs_dest_path = abs_dest_path
+
+class StubFiles:
+    '''Stub for Files that resolves any path.'''
+
+    def get_file_from_path(self, path: str) -> StubFile:
+        return StubFile(path)
+
+class StubPage:
+    '''Stub for Page with the properties used by hooks.'''
+
+    def __init__(self, name: str, markdown: str, page_meta: dict, data_dir: str):
+        self.file = StubFile(f"en/rules/{name}.md", os.path.join(data_dir, "en", "rules", f"{name}.md"), os.path.join(data_dir, "site", "en", "rules", name, "index.html"))
+        self.markdown = markdown
+        self.source_meta = page_meta
+        self.meta = dict(page_meta)
+        self.title = None
+        self.url = f"en/rules/{name}/"
+        self.abs_url = f"/PSRule.Rules.Azure/{self.url}"
+        self.canonical_url = f"{SITE_URL}/{self.url}"
+
+        # Hooks store rule metadata in annotations, which is per instance for stubs.
+        self.__annotations__ = {}
+
+#
+# Scenarios
+#
+
+def benchmark_patterns(pages: list[str], iterations: int) -> list[tuple]:
+    '''Compare per-page regular expression cost with and without precompiled patterns.'''
+
+    compiled = [
+        patterns.SHORTCODE,
+        patterns.SAMPLES_SHORTCODE,
+        patterns.UPDATE_SHORTCODE,
+        patterns.TITLE_HEADING,
+        patterns.REFERENCE_HEADING,
+        patterns.USER_LINK,
+    ]
+
+    # Purging the re module cache before each page simulates the cache being thrashed by other extensions.
+    def uncached(markdown: str):
+        re.purge()
+        for pattern in compiled:
+            re.sub(pattern.pattern, "", markdown, flags = pattern.flags)
+
+    def precompiled(markdown: str):
+        for pattern in compiled:
+            pattern.sub("", markdown)
+
+    return [
+        ("patterns (uncached)", "docs", len(pages), _measure(uncached, pages, iterations)),
+        ("patterns (precompiled)", "docs", len(pages), _measure(precompiled, pages, iterations)),
+    ]
+
+def benchmark_hooks(corpus: str, pages: list[StubPage], config: StubConfig, iterations: int) -> list[tuple]:
+    '''Measure the cost of hooks over a corpus of rule pages.'''
+
+    files = StubFiles()
+
+    def load_metadata(page: StubPage):
+        metadata.load_metadata(page)
+
+    def shortcodes_markdown(page: StubPage):
+        shortcodes.on_page_markdown(page.markdown, page = page, config = config, files = files)
+
+    def samples_markdown(page: StubPage):
+        samples.samples_shortcode(page.markdown, page, config, files)
+
+    def old_hooks_markdown(page: StubPage):
+        page.meta = dict(page.source_meta)
+        old_hooks.on_page_markdown(page.markdown, page, config, files)
+
+    # Rule metadata is loaded once so that each page has metadata when measuring the other hooks.
+    metadata.metadata_index.clear()
+    for page in pages:
+        metadata.load_metadata(page)
+
+    return [
+        ("metadata.load_metadata", corpus, len(pages), _measure(load_metadata, pages, iterations)),
+        ("shortcodes.on_page_markdown", corpus, len(pages), _measure(shortcodes_markdown, pages, iterations)),
+        ("samples.samples_shortcode", corpus, len(pages), _measure(samples_markdown, pages, iterations)),
+        ("old_hooks.on_page_markdown", corpus, len(pages), _measure(old_hooks_markdown, pages, iterations)),
+    ]
+
+def benchmark_lexer(corpus: str, snippets: list[str], iterations: int) -> list[tuple]:
+    '''Measure the cost of lexing Bicep snippets.'''
+
+    sys.path.insert(0, os.path.join(REPO_ROOT, "packages", "bicep-syntax"))
+    from lexer import BicepLexer, token_cache
+
+    lexer = BicepLexer(cache = False)
+    regex_lexer = BicepLexer(fast = False, cache = False)
+    cached_lexer = BicepLexer()
+
+    def get_tokens(snippet: str):
+        for _ in lexer.get_tokens(snippet):
+            pass
+
+    def get_tokens_regex(snippet: str):
+        for _ in regex_lexer.get_tokens(snippet):
+            pass
+
+    def get_tokens_cached(snippet: str):
+        for _ in cached_lexer.get_tokens(snippet):
+            pass
+
+    token_cache.clear()
+    return [
+        ("BicepLexer.get_tokens", corpus, len(snippets), _measure(get_tokens, snippets, iterations)),
+        ("BicepLexer.get_tokens (fast=False)", corpus, len(snippets), _measure(get_tokens_regex, snippets, iterations)),
+        ("BicepLexer.get_tokens (cached)", corpus, len(snippets), _measure(get_tokens_cached, snippets, iterations)),
+    ]
+
+def benchmark_streaming(snippets: list[str], sizes: list[int]) -> list[tuple]:
+    '''Measure peak memory when lexing Bicep files of increasing size with and without streaming.'''
+
+    sys.path.insert(0, os.path.join(REPO_ROOT, "packages", "bicep-syntax"))
+    from lexer import BicepLexer, stream_tokens
+
+    lexer = BicepLexer(cache = False)
+
+    def get_tokens(path: str):
+        with open(path, encoding = "utf-8-sig") as f:
+            for _ in lexer.get_tokens_unprocessed(f.read()):
+                pass
+
+    def get_tokens_streaming(path: str):
+        for _ in stream_tokens(path, lexer):
+            pass
+
+    results = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        for size in sizes:
+            path = os.path.join(data_dir, f"{size}.bicep")
+            _write_bicep(path, snippets, size * 1024 * 1024)
+            results.append(("BicepLexer.get_tokens_unprocessed", f"{size} MiB", _measure_memory(get_tokens, path)))
+            results.append(("stream_tokens", f"{size} MiB", _measure_memory(get_tokens_streaming, path)))
+
+    return results
+
+def benchmark_import(iterations: int) -> list[tuple]:
+    '''Measure the cost of importing the Bicep lexer with python -X importtime.'''
+
+    path = os.path.join(REPO_ROOT, "packages", "bicep-syntax")
+
+    # Modules that are already loaded by Pygments and MkDocs are imported first, so only the cost of the lexer is measured.
+    import_lexer = "import logging, pygments.lexer; import lexer"
+
+    # Listing lexers loads the lexer from its entry point, which must not compile patterns or log.
+    _run_python("\n".join([
+        "from pygments.lexers import get_all_lexers",
+        "list(get_all_lexers())",
+        "import lexer",
+        "assert '_tokens' not in lexer.BicepLexer.__dict__ and lexer.BicepLexer._merged == None",
+    ]), path)
+
+    return [
+        ("import lexer", _measure_import(import_lexer, path, iterations)),
+    ]
+
+#
+# Supporting functions
+#
+
+def _load_pages(path: str) -> list[str]:
+    '''Load the markdown source of each page in the docs corpus.'''
+
+    pages = []
+    for file in sorted(glob.glob(os.path.join(path, "**", "*.md"), recursive = True)):
+        with open(file, encoding = "utf-8-sig") as f:
+            pages.append(f.read())
+
+    return pages
+
+def _load_rules(docs_dir: str) -> list[tuple[str, str]]:
+    '''Load the name and source of each rule page in the English docs.'''
+
+    rules = []
+    for file in sorted(glob.glob(os.path.join(docs_dir, "en", "rules", "Azure.*.md"))):
+        with open(file, encoding = "utf-8-sig") as f:
+            rules.append((os.path.splitext(os.path.basename(file))[0], f.read()))
+
+    return rules
+
+def _load_snippets(docs_dir: str) -> list[str]:
+    '''Load each Bicep example used in the docs.'''
+
+    snippets = []
+    for file in sorted(glob.glob(os.path.join(docs_dir, "examples", "**", "*.bicep"), recursive = True)):
+        with open(file, encoding = "utf-8-sig") as f:
+            snippets.append(f.read())
+
+    return snippets
+
+def _scale(items: list, count: int) -> list:
+    '''Repeat items until the list has the requested count.'''
+
+    return [items[i % len(items)] for i in range(count)]
+
+def _synthetic_rules(rules: list[tuple[str, str]], count: int) -> list[tuple[str, str]]:
+    '''Create a synthetic corpus by repeating real rule pages under new names.'''
+
+    return [(f"{name}.S{i}", source) for i, (name, source) in enumerate(_scale(rules, count))]
+
+def _create_pages(rules: list[tuple[str, str]], data_dir: str) -> list[StubPage]:
+    '''Create stub pages and the generated data files that hooks read for a corpus.'''
+
+    pages = []
+    data = {}
+    avm = {}
+    for i, (name, source) in enumerate(rules):
+        markdown, page_meta = meta.get_data(source)
+        pages.append(StubPage(name, markdown, page_meta, data_dir))
+        data[name] = {
+            "Name": name,
+            "Ref": { "Name": f"AZR-{i:06}" },
+            "Alias": [],
+            "Release": "GA",
+            "RuleSet": "2025_06",
+            "Level": "Error",
+            "Synopsis": f"Synopsis for {name}.",
+            "Source": f"{REPO_URL}blob/main/src/PSRule.Rules.Azure/rules/{name}.Rule.ps1",
+        }
+        for match in re.finditer(r"<!-- external:avm (\S+)", markdown):
+            avm[match.group(1).split(":")[0]] = { "Latest": "0.1.0" }
+
+    rules_dir = os.path.join(data_dir, "en", "rules")
+    os.makedirs(rules_dir, exist_ok = True)
+    with open(os.path.join(rules_dir, "metadata.json"), "w") as f:
+        json.dump(data, f)
+
+    with open(os.path.join(rules_dir, "avm_versions.json"), "w") as f:
+        json.dump(avm, f)
+
+    return pages
+
+def _measure(action, items: list, iterations: int) -> float:
+    '''Get the best total time in seconds to run an action over all items.'''
+
+    best = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        for item in items:
+            action(item)
+
+        elapsed = time.perf_counter() - start
+        if best == None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def _write_bicep(path: str, snippets: list[str], size: int):
+    '''Write a Bicep file of at least the requested size by repeating snippets.'''
+
+    written = 0
+    with open(path, "w", encoding = "utf-8") as f:
+        while written < size:
+            for snippet in snippets:
+                written += f.write(snippet + "\n")
+
+def _measure_memory(action, item) -> int:
+    '''Get the peak bytes allocated while running an action.'''
+
+    tracemalloc.start()
+    try:
+        action(item)
+        _, peak = tracemalloc.get_traced_memory()
+        return peak
+
+    finally:
+        tracemalloc.stop()
+
+def _measure_import(code: str, path: str, iterations: int) -> float:
+    '''Get the best cumulative time in seconds to import the lexer module when running code in a new process.'''
+
+    best = None
+    for _ in range(iterations + 1):
+        for line in _run_python(code, path, "-X", "importtime"):
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if name.strip() == "lexer":
+                elapsed = int(cumulative) / 1000000
+                if best == None or elapsed < best:
+                    best = elapsed
+
+    return best
+
+def _run_python(code: str, path: str, *options: str) -> list[str]:
+    '''Run code in a new process with the lexer on the path, returning import time lines and failing on other output.'''
+
+    # Bytecode is written on the first run, so later runs measure imports as they are after installing.
+    env = dict(os.environ, PYTHONPATH = path)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    process = subprocess.run([sys.executable, *options, "-c", code], env = env, capture_output = True, text = True, check = True)
+    lines = []
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:"):
+            lines.append(line)
+        elif line.strip() != "":
+            raise RuntimeError(f"Unexpected output when importing the lexer: {line}")
+
+    return lines
+
+def _format(results: list[tuple]) -> list[str]:
+    '''Format results as a markdown table.'''
+
+    lines = [
+        "| Scenario | Corpus | Pages | Total | Per page |",
+        "| -------- | ------ | ----: | ----: | -------: |",
+    ]
+    for name, corpus, count, elapsed in results:
+        lines.append(f"| {name} | {corpus} | {count} | {elapsed * 1000:.2f} ms | {elapsed / count * 1000000:.2f} us |")
+
+    return lines
+
+def _format_memory(results: list[tuple]) -> list[str]:
+    '''Format memory results as a markdown table.'''
+
+    lines = [
+        "| Scenario | File size | Peak memory |",
+        "| -------- | --------: | ----------: |",
+    ]
+    for name, size, peak in results:
+        lines.append(f"| {name} | {size} | {peak / 1024 / 1024:.2f} MiB |")
+
+    return lines
+
+def _format_import(results: list[tuple]) -> list[str]:
+    '''Format import results as a markdown table.'''
+
+    lines = [
+        "| Scenario | Import time |",
+        "| -------- | ----------: |",
+    ]
+    for name, elapsed in results:
+        lines.append(f"| {name} | {elapsed * 1000:.2f} ms |")
+
+    return lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Run benchmarks for docs hooks.")
+    parser.add_argument("--docs", default = os.path.join(REPO_ROOT, "docs"), help = "Path to the docs directory.")
+    parser.add_argument("--iterations", type = int, default = 3, help = "Number of iterations for each scenario.")
+    parser.add_argument("--scales", default = "1000,10000,50000", help = "Comma separated sizes of synthetic corpora.")
+    parser.add_argument("--stream-sizes", default = "1,2,4", help = "Comma separated sizes in MiB of Bicep files for streaming.")
+    parser.add_argument("--max-import-ms", type = float, default = 5.0, help = "Fail if importing the Bicep lexer takes longer than this.")
+    parser.add_argument("--output", default = None, help = "Path to write results as markdown.")
+    args = parser.parse_args()
+
+    config = StubConfig(os.path.abspath(args.docs))
+    shortcodes.on_pre_build(config)
+    samples.toc_fragments.clear()
+    for group in ["baselines", "rules", "suppression"]:
+        samples.toc_fragments[group] = ""
+
+    rules = _load_rules(config.docs_dir)
+    snippets = _load_snippets(config.docs_dir)
+    results = benchmark_patterns(_load_pages(config.docs_dir), args.iterations)
+
+    corpora = [("docs/en/rules", rules, "docs/examples", snippets)]
+    for scale in [int(x) for x in args.scales.split(",") if x]:
+        corpora.append((f"synthetic {scale}", _synthetic_rules(rules, scale), f"synthetic {scale}", _scale(snippets, scale)))
+
+    for corpus, corpus_rules, snippets_corpus, corpus_snippets in corpora:
+        print(f"Running {corpus} ...", file = sys.stderr)
+        with tempfile.TemporaryDirectory() as data_dir:
+            pages = _create_pages(corpus_rules, data_dir)
+            results.extend(benchmark_hooks(corpus, pages, config, args.iterations))
+
+        results.extend(benchmark_lexer(snippets_corpus, corpus_snippets, args.iterations))
+
+    print(f"Running streaming ...", file = sys.stderr)
+    memory = benchmark_streaming(snippets, [int(x) for x in args.stream_sizes.split(",") if x])
+
+    print(f"Running import ...", file = sys.stderr)
+    imports = benchmark_import(args.iterations)
+
+    lines = [
+        f"Python {platform.python_version()}, {platform.platform()}, {platform.processor() or platform.machine()}",
+        "",
+        *_format(results),
+        "",
+        *_format_memory(memory),
+        "",
+        *_format_import(imports),
+    ]
+    print("\n".join(lines))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok = True)
+        with open(args.output, "w", encoding = "utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    # Importing the lexer is guarded so that registering it with Pygments stays cheap.
+    slowest = max(elapsed for _, elapsed in imports)
+    if slowest * 1000 > args.max_import_ms:
+        print(f"Importing the Bicep lexer took {slowest * 1000:.2f} ms, which is more than {args.max_import_ms} ms.", file = sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,111 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# This file implements splitting the change log into a page for each minor release using MkDocs native hooks.
+# The change log page is replaced with an index of releases, so each release is rendered and indexed on its own page.
+
+import logging
+
+import badges
+import patterns
+
+from markdown.extensions.toc import slugify
+from mkdocs.config.defaults import MkDocsConfig
+from mkdocs.structure.files import File, Files
+from mkdocs.structure.pages import Page
+
+log = logging.getLogger(f"mkdocs")
+
+# The source path of the change log.
+CHANGELOG = "changelog.md"
+
+# Markdown for the change log index of the current build, keyed by source path.
+changelog_indexes: dict[str, str] = {}
+
+#
+# Hooks
+#
+
+def on_files(files: Files, config: MkDocsConfig) -> Files:
+    '''Hook on_files event.'''
+
+    changelog_indexes.clear()
+    file = files.get_file_from_path(CHANGELOG)
+    if file != None:
+        split_changelog(file, files, config)
+
+    return files
+
+def on_page_markdown(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Hook on_page_markdown event.'''
+
+    return changelog_indexes.get(page.file.src_uri, markdown)
+
+#
+# Supporting functions
+#
+
+def split_changelog(file: File, files: Files, config: MkDocsConfig):
+    '''Add a page for each minor release in the change log, and keep an index of releases for the change log page.'''
+
+    source = file.content_string
+    match = patterns.FRONTMATTER.match(source)
+    frontmatter = match.group(0) if match != None else ""
+    body = source[len(frontmatter):]
+
+    headings = list(patterns.CHANGELOG_HEADING.finditer(body))
+    if len(headings) == 0:
+        return
+
+    # Each page repeats the link reference definitions, since they can be used by any release.
+    references = "\n".join(patterns.LINK_REFERENCE.findall(body))
+    toc = config.mdx_configs.get('toc', {})
+    slug = toc.get('slugify', slugify)
+    separator = toc.get('separator', '-')
+
+    # Sections without a version, such as unreleased changes, are kept on the index.
+    index = [body[:headings[0].start()]]
+    releases: dict[tuple[str, str], list[tuple[str, str]]] = {}
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(body)
+        section = body[heading.start():end]
+        text, major, minor = heading.groups()
+        if major == None:
+            index.append(section)
+            continue
+
+        releases.setdefault((major, minor), []).append((text, section))
+
+    index.append("## Releases\n\n")
+    for (major, minor), sections in releases.items():
+        path = badges.changelog_path(major, minor)
+        files.append(File.generated(config, path, content="".join([
+            _release_frontmatter(frontmatter, f"v{major}.{minor}"),
+            f"# Change log for v{major}.{minor}\n\n",
+            f"See [change log]({CHANGELOG}) for unreleased changes and other releases.\n\n",
+            *[section for _, section in sections],
+            f"\n{references}\n",
+        ])))
+
+        # Anchors for each release are kept on the index, so existing links to the change log still resolve.
+        index.append(f"### v{major}.{minor}.x\n\n")
+        for text, _ in sections:
+            anchor = slug(text, separator)
+            index.append(f"- <a id=\"{anchor}\"></a>[{text}]({path}#{anchor})\n")
+
+        index.append("\n")
+
+    index.append(f"{references}\n")
+    changelog_indexes[file.src_uri] = "".join(index)
+    log.info(f"Split change log into {len(releases)} release pages.")
+
+def _release_frontmatter(frontmatter: str, release: str) -> str:
+    '''Get the frontmatter for the page of a release, using the frontmatter of the change log with a description of the release.'''
+
+    lines = [line for line in frontmatter.splitlines(keepends=True) if not line.startswith("description:")]
+    if len(lines) < 2:
+        return ""
+
+    description = f"description: See what is new and changed in {release} of PSRule for Azure.\n"
+    return "".join([lines[0], description, *lines[1:]])
@@ -0,0 +1,49 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# This file implements tracking of the includes, metadata, and samples that each page uses, shared by docs hooks.
+# When a dependency changes between builds, the built output of each page that used it is removed.
+# This lets a dirty build, such as mkdocs serve --dirty, rebuild only the affected pages and keep the output of other pages.
+# Builds that are not dirty, including mkdocs serve without --dirty, still render every page.
+
+import logging
+import os
+
+from mkdocs.structure.pages import Page
+
+log = logging.getLogger(f"mkdocs")
+
+# Built output of the pages that used each dependency, keyed by dependency.
+# Each dependency is a tuple of the kind of dependency followed by the arguments used to resolve it.
+dependents: dict[tuple, set[str]] = {}
+
+# The value of each dependency when it was last used by a page.
+values: dict[tuple, any] = {}
+
+def record(key: tuple, value: any, page: Page) -> any:
+    '''Record that a page used the value of a dependency, returning the value.'''
+
+    dependents.setdefault(key, set()).add(page.file.abs_dest_path)
+    values[key] = value
+    return value
+
+def invalidate(kind: str, resolve) -> int:
+    '''Remove the built output of pages that used a dependency of a kind with a changed value, returning the number of pages removed.'''
+
+    changed = [key for key, value in values.items() if key[0] == kind and resolve(*key[1:]) != value]
+    paths = set()
+    for key in changed:
+        paths.update(dependents.pop(key))
+        del values[key]
+
+    count = 0
+    for path in paths:
+        if os.path.isfile(path):
+            os.remove(path)
+            count += 1
+
+    if count > 0:
+        log.info(f"Dependencies: {len(changed)} changed {kind} entries, {count} pages to rebuild.")
+
+    return count
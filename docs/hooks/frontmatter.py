@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# This file implements a cache of frontmatter for documentation files shared by docs hooks.
+# Only the leading metadata block of each file is read, and files are only read again when modified.
+
+import logging
+import os
+import patterns
+
+from mkdocs.structure.files import File
+from mkdocs.utils import meta
+
+log = logging.getLogger(f"mkdocs")
+
+# Frontmatter keyed by the absolute source path of the file.
+# Each entry is a tuple of the file modified time and the metadata.
+frontmatter_cache: dict[str, tuple[float, dict]] = {}
+
+def get_frontmatter(file: File) -> dict[str, any]:
+    '''Get the frontmatter for a file, only reading the file if it is new or has been modified.'''
+
+    path = file.abs_src_path
+    mtime = os.path.getmtime(path)
+
+    cached = frontmatter_cache.get(path, None)
+    if cached != None and cached[0] == mtime:
+        return cached[1]
+
+    _, data = meta.get_data(_read_frontmatter(path))
+    frontmatter_cache[path] = (mtime, data)
+    return data
+
+def _read_frontmatter(path: str) -> str:
+    '''Read the leading metadata block of a file without reading the body.'''
+
+    lines = []
+    yaml = False
+    with open(path, encoding="utf-8-sig", errors="strict") as f:
+        for line in f:
+            lines.append(line)
+            if len(lines) == 1:
+                yaml = patterns.FRONTMATTER_OPENING_LINE.fullmatch(line) != None
+
+            # YAML frontmatter ends at the closing delimiter after at least one line.
+            if yaml:
+                if len(lines) > 2 and patterns.FRONTMATTER_CLOSING_LINE.fullmatch(line):
+                    break
+
+            # MultiMarkdown metadata ends at the first blank line.
+            elif line.strip() == "":
+                break
+
+    return "".join(lines)
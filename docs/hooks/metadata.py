@@ -7,6 +7,7 @@
 import logging
 import os
 import json
+import dependencies
 
 from mkdocs.config.defaults import MkDocsConfig
 from mkdocs.structure.files import File, Files
@@ -14,10 +15,20 @@ from mkdocs.structure.pages import Page
 
 log = logging.getLogger(f"mkdocs")
 
+# Rule metadata loaded from metadata.json, keyed by the directory containing the file.
+# Each entry is a tuple of the file modified time and the parsed data.
+metadata_index: dict[str, tuple[float, dict]] = {}
+
 #
 # Hooks
 #
 
+def on_pre_build(config: MkDocsConfig):
+    '''Hook on_pre_build event.'''
+
+    load_metadata_index(config)
+    dependencies.invalidate('metadata', lambda path, name: _get_metadata_index(path).get(name, None) if os.path.isfile(os.path.join(path, 'metadata.json')) else None)
+
 def on_pre_page(page: Page, config: MkDocsConfig, files: Files) -> Page:
     '''Hook on_pre_page event.'''
 
@@ -47,6 +58,41 @@ def is_rule_page(page: Page) -> bool:
 
     return False
 
+def load_metadata_index(config: MkDocsConfig):
+    '''Load metadata for rules in each culture into the index, skipping files that have not changed.'''
+
+    for culture in os.listdir(config.docs_dir):
+        path = os.path.join(config.docs_dir, culture, 'rules')
+        if os.path.isfile(os.path.join(path, 'metadata.json')):
+            _refresh_metadata_index(path)
+
+def _refresh_metadata_index(path: str) -> dict:
+    '''Refresh the index for a directory if metadata.json is new or has been modified.'''
+
+    path = os.path.normpath(path)
+    file: str = os.path.join(path, 'metadata.json')
+    mtime = os.path.getmtime(file)
+
+    cached = metadata_index.get(path, None)
+    if cached != None and cached[0] == mtime:
+        return cached[1]
+
+    log.debug(f"Loading metadata index from: {file}")
+    with open(file) as f:
+        data = json.load(f)
+
+    metadata_index[path] = (mtime, data)
+    return data
+
+def _get_metadata_index(path: str) -> dict:
+    '''Get the indexed metadata for a directory, loading it on first use.'''
+
+    cached = metadata_index.get(os.path.normpath(path), None)
+    if cached != None:
+        return cached[1]
+
+    return _refresh_metadata_index(path)
+
 def read_metadata(page: Page, name: str) -> Page:
     '''Read the metadata for a rule.'''
 
@@ -55,35 +101,30 @@ def read_metadata(page: Page, name: str) -> Page:
     meta = {}
     meta['rule'] = name
 
-    file: str = os.path.join(os.path.dirname(page.file.abs_src_path), 'metadata.json')
-    with open(file) as f:
-        data = json.load(f)
-        if data.get(name, None) != None and data[name].get('Ref', None) != None and data[name]['Ref'].get('Name', None) != None:
-            meta['ref'] = data[name]['Ref']['Name']
-
-        if data.get(name, None) != None and data[name].get('Release', None) != None:
-            meta['release'] = data[name]['Release']
+    path = os.path.dirname(page.file.abs_src_path)
+    rule = dependencies.record(('metadata', path, name), _get_metadata_index(path).get(name, None), page)
+    if rule != None:
+        if rule.get('Ref', None) != None and rule['Ref'].get('Name', None) != None:
+            meta['ref'] = rule['Ref']['Name']
 
-        if data.get(name, None) != None and data[name].get('RuleSet', None) != None:
-            meta['ruleSet'] = data[name]['RuleSet']
+        if rule.get('Release', None) != None:
+            meta['release'] = rule['Release']
 
-        if data.get(name, None) != None and data[name].get('Level', None) != None:
-            meta['level'] = data[name]['Level']
+        if rule.get('RuleSet', None) != None:
+            meta['ruleSet'] = rule['RuleSet']
 
-        if data.get(name, None) != None and data[name].get('Synopsis', None) != None:
-            description = data[name]['Synopsis']
-            meta['description'] = description
+        if rule.get('Level', None) != None:
+            meta['level'] = rule['Level']
 
-        if data.get(name, None) != None and data[name].get('Source', None) != None:
-            meta['source'] = data[name]['Source']
+        if rule.get('Synopsis', None) != None:
+            meta['description'] = rule['Synopsis']
 
-        if data.get(name, None) != None and data[name].get('Alias', None) != None and len(data[name]['Alias']) > 0:
-            log.debug(f"Found page alias {data[name]['Alias']} for: {page.abs_url}")
-            aliases = []
-            for alias in data[name]['Alias']:
-                aliases.append(alias)
+        if rule.get('Source', None) != None:
+            meta['source'] = rule['Source']
 
-            meta['alias'] = aliases
+        if rule.get('Alias', None) != None and len(rule['Alias']) > 0:
+            log.debug(f"Found page alias {rule['Alias']} for: {page.abs_url}")
+            meta['alias'] = list(rule['Alias'])
 
     page.__annotations__['__psrule__'] = meta
     return page
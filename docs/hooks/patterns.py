@@ -0,0 +1,84 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# This file implements regular expression patterns shared by docs hooks.
+# Patterns are compiled once on import instead of relying on the re module cache.
+
+import re
+
+# Shortcodes in the form {{ module:type args }}, multi-line deprecation notes, and <!-- namespace:type args -->.
+# Each alternative captures the namespace, type, and arguments as the last three groups.
+# Deprecation notes can contain other shortcodes in the form <!-- namespace:type args -->, so the note continues past them.
+SHORTCODE = re.compile(
+    r"{{ (module):(\w+)(.*?) }}"
+    r"|<!-- (deprecation):(\w+)((?s:(?:<!--.*?-->|.)*?))-->"
+    r"|<!-- (\w+):(\w+)(.*?) -->",
+    flags = re.I
+)
+
+# Samples shortcodes in the form <!-- samples:type args -->.
+SAMPLES_SHORTCODE = re.compile(r"<!-- samples:(\w+)(.*?) -->", flags = re.I | re.M)
+
+# Update shortcodes in the form <!-- update:type args -->.
+UPDATE_SHORTCODE = re.compile(r"<!-- update:(\w+)(.*?) -->", flags = re.I | re.M)
+
+# The first level heading of a page.
+TITLE_HEADING = re.compile(r"^# (.+)$", flags = re.M)
+
+# Headings from MAML help that are replaced on every page.
+MAML_HEADINGS = {
+    "## about_PSRule_Azure_Configuration": "",
+    "# PSRule_Azure_Configuration": "# Configuration options",
+}
+
+# Headings from MAML help that are replaced on reference pages, in addition to MAML_HEADINGS.
+REFERENCE_HEADINGS = {
+    **MAML_HEADINGS,
+
+    # Rules
+    "## SYNOPSIS": "",
+    "## DESCRIPTION": "## Description",
+    "## RECOMMENDATION": "## Recommendation",
+    "## NOTES": "## Notes",
+    "## EXAMPLES": "## Examples",
+    "## LINKS": "## Links",
+    "## DEPRECATION\n\n": "",
+
+    # Conceptual topics
+    "## SHORT DESCRIPTION": "",
+    "## LONG DESCRIPTION": "## Description",
+}
+
+def _headings(headings: dict[str, str], *extra: str) -> re.Pattern:
+    '''Compile a pattern that matches any of the headings, longest first, or any extra patterns.'''
+
+    # Every alternative starts with '#', which is factored out so that the pattern has a literal prefix to scan for.
+    alternatives = [re.escape(heading[1:]) for heading in sorted(headings, key = len, reverse = True)]
+    alternatives.extend(pattern[1:] for pattern in extra)
+    return re.compile("#(?:" + "|".join(alternatives) + ")")
+
+# Any heading in MAML_HEADINGS.
+MAML_HEADING = _headings(MAML_HEADINGS)
+
+# Any heading in REFERENCE_HEADINGS or a heading from conceptual topics that is removed.
+REFERENCE_HEADING = _headings(REFERENCE_HEADINGS, "## +(?:NOTE|KEYWORDS) +(?:.| {1,2}(?!#))+")
+
+# Mentions of GitHub users, replaced with links when link_users is set on a page.
+USER_LINK = re.compile(r"\@([\w-]*)")
+
+# A YAML frontmatter block at the start of a page.
+FRONTMATTER = re.compile(r"\A-{3}[ \t]*\n(?:.*?\n)?(?:\.{3}|-{3})[ \t]*\n", flags = re.S)
+
+# The lines that open and close a YAML frontmatter block.
+FRONTMATTER_OPENING_LINE = re.compile(r"-{3}[ \t]*\n")
+FRONTMATTER_CLOSING_LINE = re.compile(r"(?:\.{3}|-{3})[ \t]*\n")
+
+# Second level headings of the change log, capturing the heading text, and the major and minor version of release headings.
+CHANGELOG_HEADING = re.compile(r"^## +((?:v(\d+)\.(\d+)\b)?.*?) *$", flags = re.M)
+
+# Link reference definitions in the form [label]: url.
+LINK_REFERENCE = re.compile(r"^\[[^\]\n]+\]: +\S.*$", flags = re.M)
+
+# Locations of sections of rule pages in the search index, with an optional locale.
+SEARCH_RULE_LOCATION = re.compile(r"(?:[a-z]{2}/)?rules/Azure\.[^/]+/#")
@@ -0,0 +1,151 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# This file implements opt-in profiling of docs hooks using MkDocs native hooks.
+# Set the PSRULE_DOCS_PROFILE environment variable to true to record the wall time of each hook during a build.
+# Set it to memory to record the peak allocated bytes of each hook instead, which slows down hooks while they are traced.
+# A report is written to the log and to out/docs-hook-profile.json after the build.
+
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+from mkdocs.config.defaults import MkDocsConfig
+from mkdocs.plugins import event_priority
+from mkdocs.structure.pages import Page
+
+log = logging.getLogger(f"mkdocs")
+
+# Measurements keyed by hook and event name, and by page source path.
+hook_stats: dict[str, dict[str, float]] = {}
+page_stats: dict[str, dict[str, float]] = {}
+
+#
+# Hooks
+#
+
+def on_config(config: MkDocsConfig) -> MkDocsConfig:
+    '''Hook on_config event.'''
+
+    if not is_enabled():
+        return config
+
+    hook_stats.clear()
+    page_stats.clear()
+    wrap_hooks(config, is_memory())
+    return config
+
+@event_priority(-100)
+def on_post_build(config: MkDocsConfig):
+    '''Hook on_post_build event.'''
+
+    if not is_enabled():
+        return
+
+    report(config)
+
+#
+# Supporting functions
+#
+
+def is_enabled() -> bool:
+    '''Check if profiling is enabled by the environment.'''
+
+    return os.environ.get('PSRULE_DOCS_PROFILE', 'false').lower() in ('true', '1', 'memory')
+
+def is_memory() -> bool:
+    '''Check if profiling of allocated memory is enabled by the environment.'''
+
+    return os.environ.get('PSRULE_DOCS_PROFILE', 'false').lower() == 'memory'
+
+def wrap_hooks(config: MkDocsConfig, memory: bool):
+    '''Replace event methods registered by other hooks with methods that record their cost.'''
+
+    # Hooks are loaded as modules named by their path, so this hook can be excluded by module name.
+    hooks = set(config.hooks.keys())
+    hooks.discard(__name__)
+
+    plugins = config.plugins
+    for event, methods in plugins.events.items():
+        for i, method in enumerate(methods):
+            hook = plugins._event_origins.get(method, None)
+            if hook not in hooks or getattr(method, '__profiled__', False):
+                continue
+
+            wrapper = _profile(f"{os.path.basename(hook)}:on_{event}", method, memory)
+            methods[i] = wrapper
+            plugins._event_origins[wrapper] = hook
+
+def report(config: MkDocsConfig):
+    '''Write a report of hook and page cost to the log and a JSON file.'''
+
+    # Wall time is not reported when memory is traced, because tracing slows down hooks by how much they allocate.
+    key = 'allocated' if is_memory() else 'time'
+    hooks = sorted(hook_stats.items(), key=lambda x: x[1][key], reverse=True)
+    pages = sorted(page_stats.items(), key=lambda x: x[1][key], reverse=True)
+
+    log.info("Docs hook profile:")
+    for name, stats in hooks:
+        log.info(f"  {name:<40} {_format(stats, key)} {stats['calls']:>6} calls")
+
+    log.info("Most expensive pages:")
+    for path, stats in pages[:10]:
+        log.info(f"  {path:<60} {_format(stats, key)}")
+
+    out_dir = os.path.join(config.docs_dir, "..", "out")
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "docs-hook-profile.json"), "w", encoding="utf-8") as f:
+        json.dump({ 'hooks': dict(hooks), 'pages': dict(pages) }, f, indent=2)
+
+def _format(stats: dict[str, float], key: str) -> str:
+    '''Format the measurement of a hook or page that is reported.'''
+
+    if key == 'allocated':
+        return f"{stats['allocated'] / 1024:>10.1f} KiB"
+
+    return f"{stats['time'] * 1000:>10.1f} ms"
+
+def _profile(name: str, method, memory: bool):
+    '''Wrap a hook method to record calls, and either wall time or peak allocated bytes.'''
+
+    # Memory is only traced while a hook runs, so the rest of the build is not slowed down by tracing.
+    def wrapper(*args, **kwargs):
+        elapsed = 0.0
+        allocated = 0
+        if memory:
+            tracemalloc.start()
+        else:
+            start = time.perf_counter()
+
+        try:
+            return method(*args, **kwargs)
+        finally:
+            if memory:
+                _, allocated = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            else:
+                elapsed = time.perf_counter() - start
+
+            _record(hook_stats, name, elapsed, allocated)
+
+            # Some events such as on_pre_page pass the page as the first positional argument.
+            page = kwargs.get('page', None)
+            if page == None and len(args) > 0 and isinstance(args[0], Page):
+                page = args[0]
+
+            if page != None:
+                _record(page_stats, page.file.src_path, elapsed, allocated)
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+def _record(stats: dict[str, dict[str, float]], key: str, elapsed: float, allocated: int):
+    '''Add a measurement to the stats for a key.'''
+
+    entry = stats.setdefault(key, { 'time': 0.0, 'calls': 0, 'allocated': 0 })
+    entry['time'] += elapsed
+    entry['calls'] += 1
+    entry['allocated'] += allocated
@@ -4,9 +4,12 @@
 # NOTES:
 # This file implements generation of samples TOC.
 
+import hashlib
 import logging
 import os
 import re
+import dependencies
+import patterns
 
 from mkdocs.config.defaults import MkDocsConfig
 from mkdocs.structure.files import Files
@@ -14,6 +17,16 @@ from mkdocs.structure.pages import Page
 
 log = logging.getLogger(f"mkdocs")
 
+# Properties of each sample keyed by the path to the README.md file.
+# Each entry is a tuple of the file modified time and the title, description, and author.
+sample_properties: dict[str, tuple[float, tuple[str, str, str]]] = {}
+
+# Generated TOC fragments for the current build, keyed by samples group.
+toc_fragments: dict[str, str] = {}
+
+# Hash of the content last written to each TOC file, keyed by the path to the file.
+toc_hashes: dict[str, str] = {}
+
 #
 # Hooks
 #
@@ -21,10 +34,11 @@ log = logging.getLogger(f"mkdocs")
 def on_pre_build(config: MkDocsConfig):
     '''Hook on_pre_build event.'''
 
-    # return generate_samples_toc_fragment(config)
+    toc_fragments.clear()
     _samples_group(config, 'baselines')
     _samples_group(config, 'rules')
     _samples_group(config, 'suppression')
+    dependencies.invalidate('samples', lambda group: toc_fragments.get(group, None))
 
 def on_page_markdown(markdown: str, *, page: Page, config: MkDocsConfig, files: Files) -> str:
     '''Hook on_page_markdown event.'''
@@ -35,80 +49,13 @@ def on_page_markdown(markdown: str, *, page: Page, config: MkDocsConfig, files:
 # Supporting functions
 #
 
-def generate_samples_toc_fragment(config: MkDocsConfig):
-    '''Generate a markdown fragment that will be injected into files containing a short code.'''
-
-    # Get the samples directory which is in a parent directory.
-    repo_root_dir = os.path.join(config.docs_dir, "..")
-    samples_dir = os.path.join(repo_root_dir, "samples", "rules")
-
-    # Get the base repo URI.
-    base_repo_uri = config.repo_url
-    samples_repo_uri = f"{base_repo_uri}tree/main/samples/rules"
-
-    # Generate the TOC fragment, each sample exists as a README.md file in a subdirectory.
-    toc = []
-    for root, dirs, _ in os.walk(samples_dir):
-        for dir in dirs:
-            if dir == "common":
-                continue
-
-            current_sample_dir = os.path.join(root, dir)
-            title = ""
-            description = []
-            author = ""
-            block = "none"
-
-            # Read the file to get the title and lines until the first empty line.
-            with open(os.path.join(current_sample_dir, "README.md"), "r") as f:
-
-                # Read annotations and header.
-                for line in f:
-                    if (block == "none" or block == "metadata") and line.strip() == "---":
-                        if block == "none":
-                            block = "metadata"
-                        elif block == "metadata":
-                            block = "header"
-
-                        continue
-
-                    if block == "metadata" and line.startswith("author:") and line.strip("author:").strip() != "":
-                        author = line.strip("author:").strip()
-                        author = f"@{author}"
-                        continue
-
-                    if block == "metadata":
-                        continue
-
-                    if block == "header" or line.startswith("# "):
-                        if line.startswith("# "):
-                            title = line.strip("# ").strip()
-                            block = "header"
-                            continue
-
-                        if line.strip() == "":
-                            continue
-
-                        # Keep reading until the first H2 heading.
-                        if line.startswith("## "):
-                            break
-
-                        description.append(line.strip())
-
-            # Write the TOC entry as a row in a markdown table.
-            toc.append(f"| [{title}]({'/'.join([samples_repo_uri, dir])}) | {' '.join(description)} | {author} |")
-
-    # Write the TOC to a markdown file in a table with title and description.
-    toc_file = os.path.join(repo_root_dir, "out", "samples_toc.md")
-    with open(toc_file, "w") as f:
-        f.write("| Title | Description | Author |\n")
-        f.write("| ----- | ----------- | ------ |\n")
-        for entry in toc:
-            f.write(f"{entry}\n")
-
 def samples_shortcode(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
     '''Replace samples shortcodes in markdown.'''
 
+    # Skip pages that do not contain any shortcodes.
+    if not '<!--' in markdown:
+        return markdown
+
     # Callback for regular expression replacement.
     def replace(match: re.Match) -> str:
         type, args = match.groups()
@@ -126,18 +73,13 @@ def samples_shortcode(markdown: str, page: Page, config: MkDocsConfig, files: Fi
         raise RuntimeError(f"Unknown shortcode samples:{type}")
 
     # Replace samples shortcodes.
-    return re.sub(
-        r"<!-- samples:(\w+)(.*?) -->",
-        replace, markdown, flags = re.I | re.M
-    )
+    return patterns.SAMPLES_SHORTCODE.sub(replace, markdown)
 
 def _samples_rules_fragment(args: str, page: Page, config: MkDocsConfig, files: Files, type: str) -> str:
     '''Replace samples shortcode with rules fragment.'''
 
-    # Get the TOC fragment from the file.
-    toc_file = os.path.join(config.docs_dir, "..", "out", f"samples_toc_{type}.md")
-    with open(toc_file, "r") as f:
-        return f.read()
+    # Get the TOC fragment generated during pre-build.
+    return dependencies.record(('samples', type), toc_fragments[type], page)
 
 def _samples_group(config: MkDocsConfig, group: str):
 
@@ -161,13 +103,35 @@ def _samples_group(config: MkDocsConfig, group: str):
             # Write the TOC entry as a row in a markdown table.
             toc.append(f"| [{title}]({'/'.join([samples_repo_uri, dir])}) | {description} | {author} |")
 
-    # Write the TOC to a markdown file in a table with title and description.
-    toc_file = os.path.join(repo_root_dir, "out", f"samples_toc_{group}.md")
-    with open(toc_file, "w") as f:
-        f.write("| Title | Description | Author |\n")
-        f.write("| ----- | ----------- | ------ |\n")
-        for entry in toc:
-            f.write(f"{entry}\n")
+    # Keep the TOC as a markdown table with title and description.
+    content = "".join([
+        "| Title | Description | Author |\n",
+        "| ----- | ----------- | ------ |\n",
+        *[f"{entry}\n" for entry in toc],
+    ])
+    toc_fragments[group] = content
+
+    # Write the TOC to a markdown file when the output directory exists.
+    out_dir = os.path.join(repo_root_dir, "out")
+    if os.path.isdir(out_dir):
+        _write_if_changed(os.path.join(out_dir, f"samples_toc_{group}.md"), content)
+
+def _write_if_changed(path: str, content: str):
+    '''Write content to a file, skipping the write if the file already has the same content.'''
+
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    if toc_hashes.get(path, None) == None and os.path.isfile(path):
+        with open(path, "r") as f:
+            toc_hashes[path] = hashlib.sha256(f.read().encode("utf-8")).hexdigest()
+
+    if toc_hashes.get(path, None) == digest and os.path.isfile(path):
+        log.debug(f"Skipping unchanged samples TOC: {path}")
+        return
+
+    with open(path, "w") as f:
+        f.write(content)
+
+    toc_hashes[path] = digest
 
 def _get_samples_group_dir(config: MkDocsConfig, group: str) -> str:
     '''Get the directory for a samples group.'''
@@ -176,7 +140,21 @@ def _get_samples_group_dir(config: MkDocsConfig, group: str) -> str:
     return os.path.join(repo_root_dir, "samples", group)
 
 def _get_sample_properties(path: str) -> tuple[str, str, str]:
-    '''Get the properties of a sample.'''
+    '''Get the properties of a sample, only reading README.md if it is new or has been modified.'''
+
+    file = os.path.join(path, "README.md")
+    mtime = os.path.getmtime(file)
+
+    cached = sample_properties.get(file, None)
+    if cached != None and cached[0] == mtime:
+        return cached[1]
+
+    properties = _read_sample_properties(file)
+    sample_properties[file] = (mtime, properties)
+    return properties
+
+def _read_sample_properties(file: str) -> tuple[str, str, str]:
+    '''Read the properties of a sample from the header of a README.md file.'''
 
     title = ""
     description = []
@@ -184,7 +162,7 @@ def _get_sample_properties(path: str) -> tuple[str, str, str]:
     block = "none"
 
     # Read the file to get the title and lines until the first empty line.
-    with open(os.path.join(path, "README.md"), "r") as f:
+    with open(file, "r") as f:
 
         # Read annotations and header.
         for line in f:
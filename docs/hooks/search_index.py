@@ -0,0 +1,70 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# This file implements post-processing of the search index using MkDocs native hooks.
+# Lists of links on rule pages are removed from the index written by the search plugin.
+
+import json
+import logging
+import os
+
+import patterns
+
+from mkdocs.config.defaults import MkDocsConfig
+from mkdocs.plugins import event_priority
+
+log = logging.getLogger(f"mkdocs")
+
+# The directory and name of the search index written by the search plugin.
+SEARCH_DIR = "search"
+SEARCH_INDEX = "search_index.json"
+
+# Titles of link sections on rule pages for each locale.
+LINKS_TITLES = ('Links', 'Enlaces')
+
+#
+# Hooks
+#
+
+# The search plugin writes the index in on_post_build, so the index is processed after it.
+@event_priority(-50)
+def on_post_build(config: MkDocsConfig):
+    '''Hook on_post_build event.'''
+
+    path = os.path.join(config.site_dir, SEARCH_DIR, SEARCH_INDEX)
+    if not os.path.isfile(path):
+        return
+
+    prune_search_index(path)
+
+#
+# Supporting functions
+#
+
+def prune_search_index(path: str):
+    '''Remove lists of links on rule pages from the search index.'''
+
+    with open(path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+
+    size = os.path.getsize(path)
+    docs = [doc for doc in index['docs'] if not _is_rule_links(doc)]
+    removed = len(index['docs']) - len(docs)
+
+    pruned_size = _write_json(path, { 'config': index['config'], 'docs': docs })
+    log.info(f"Search index: {removed} entries removed, {size / 1024:.1f} KiB -> {pruned_size / 1024:.1f} KiB.")
+
+def _is_rule_links(doc: dict) -> bool:
+    '''Check if an entry of the search index is the list of links at the end of a rule page.'''
+
+    return doc['title'] in LINKS_TITLES and doc['text'].startswith("<ul>") and patterns.SEARCH_RULE_LOCATION.match(doc['location']) != None
+
+def _write_json(path: str, data: dict) -> int:
+    '''Write compact JSON to a file, returning the number of bytes written.'''
+
+    content = json.dumps(data, separators=(',', ':')).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(content)
+
+    return len(content)
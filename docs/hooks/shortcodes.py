@@ -8,7 +8,9 @@ import logging
 import os
 import re
 import json
-import io
+import badges
+import dependencies
+import patterns
 
 from mkdocs.config.defaults import MkDocsConfig
 from mkdocs.structure.files import File, Files
@@ -16,191 +18,127 @@ from mkdocs.structure.pages import Page
 
 log = logging.getLogger(f"mkdocs")
 
-#
-# Hooks
-#
+# AVM module versions loaded from avm_versions.json, keyed by the directory containing the file.
+# Each entry is a tuple of the file modified time and the parsed data.
+avm_versions_cache: dict[str, tuple[float, dict]] = {}
+avm_versions_stats = { 'hits': 0, 'misses': 0 }
 
-def on_page_markdown(markdown: str, *, page: Page, config: MkDocsConfig, files: Files) -> str:
-    '''Hook on_page_markdown event.'''
-
-    return deprecation_note(security_note(external(module(markdown, page, config, files), page, config, files), page, config, files), page, config, files)
+# Content of include files keyed by culture and path relative to the culture directory.
+# Entries with a culture of None are from the default culture, and are used for cultures without an include directory.
+includes: dict[tuple[str, str], str] = {}
 
 #
-# Supporting functions
+# Hooks
 #
 
-def module(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
-    '''Replace module shortcodes in markdown.'''
+def on_pre_build(config: MkDocsConfig):
+    '''Hook on_pre_build event.'''
 
-    # Callback for regular expression replacement.
-    def replace(match: re.Match) -> str:
-        type, args = match.groups()
-        args = args.strip()
-        if type == "version":
-            return _badge_for_version(args, page, files)
-        elif type == "rule":
-            return _badge_for_applies_to_rule(args, page, files)
-        elif type == "config":
-            return _badge_for_configuration(args, page, files)
-        elif type == "resource":
-            return ''
-
-        raise RuntimeError(f"Unknown shortcode module:{type}")
-
-    # Replace module shortcodes.
-    markdown = re.sub(
-        r"{{ module:(\w+)(.*?) }}",
-        replace, markdown, flags = re.I | re.M
-    )
-    
-    return re.sub(
-        r"<!-- module:(\w+)(.*?) -->",
-        replace, markdown, flags = re.I | re.M
-    )
+    avm_versions_stats['hits'] = 0
+    avm_versions_stats['misses'] = 0
 
-def external(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
-    '''Replace external shortcodes in markdown.'''
+    # Badges are shared with other hooks, and shortcodes is the first hook to render them in each build.
+    badges.clear()
+    load_includes(config)
+    dependencies.invalidate('include', _get_include)
+    dependencies.invalidate('avm', lambda path, name: _avm_latest(path, name) if os.path.isfile(os.path.join(path, 'avm_versions.json')) else None)
 
-    # Callback for regular expression replacement.
-    def replace(match: re.Match) -> str:
-        type, args = match.groups()
-        args = args.strip()
-        if type == "avm":
-            return _external_reference_avm(args, page)
-
-        raise RuntimeError(f"Unknown shortcode external:{type}")
+def on_page_markdown(markdown: str, *, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Hook on_page_markdown event.'''
 
-    # Replace external shortcodes.
-    return re.sub(
-        r"<!-- external:(\w+)(.*?) -->",
-        replace, markdown, flags = re.I | re.M
-    )
+    return replace_shortcodes(markdown, SHORTCODE_HANDLERS, page, config, files)
 
-def security_note(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
-    '''Replace security notes shortcodes in markdown.'''
+def on_post_build(config: MkDocsConfig):
+    '''Hook on_post_build event.'''
 
-    # Callback for regular expression replacement.
-    def replace(match: re.Match) -> str:
-        type, args = match.groups()
-        args = args.strip()
-        if type == "note":
-            return _security_note_block(args, page, config)
+    log.info(f"AVM versions cache: {avm_versions_stats['hits']} hits, {avm_versions_stats['misses']} misses.")
+    log.info(f"Badges cache: {badges.badges_stats['hits']} hits, {badges.badges_stats['misses']} misses.")
+    log.info(f"Relative URIs cache: {badges.relative_uris_stats['hits']} hits, {badges.relative_uris_stats['misses']} misses.")
 
-        raise RuntimeError(f"Unknown shortcode security:{type}")
+#
+# Supporting functions
+#
 
-    # Replace security note shortcodes.
-    return re.sub(
-        r"<!-- security:(\w+)(.*?) -->",
-        replace, markdown, flags = re.I | re.M
-    )
+def replace_shortcodes(markdown: str, handlers: dict, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Replace shortcodes in markdown with a single pass over the page.'''
 
-def deprecation_note(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
-    '''Replace deprecation notes shortcodes in markdown.'''
+    # Skip pages that do not contain any shortcodes.
+    if not '<!--' in markdown and not '{{' in markdown:
+        return markdown
 
     # Callback for regular expression replacement.
     def replace(match: re.Match) -> str:
-        type, args = match.groups()
-        args = args.strip()
-        if type == "note":
-            return _deprecation_note_block(args, page, config)
+        namespace, type, args = match.group(match.lastindex - 2, match.lastindex - 1, match.lastindex)
+        handler = handlers.get(namespace.lower(), None)
+        if handler == None:
+            return match.group(0)
 
-        raise RuntimeError(f"Unknown shortcode deprecation:{type}")
+        # Shortcodes in a deprecation note are replaced before the note, so they are indented with the rest of the note.
+        if namespace.lower() == 'deprecation':
+            args = patterns.SHORTCODE.sub(replace, args)
 
-    # Replace deprecation note shortcodes.
-    return re.sub(
-        r"<!-- deprecation:(\w+)(.*?)-->",
-        replace, markdown, flags = re.I | re.M | re.S
-    )
+        return handler(type, args.strip(), page, config, files)
 
-def caf_note(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
-    '''Replace CAF notes shortcodes in markdown.'''
-
-    # Callback for regular expression replacement.
-    def replace(match: re.Match) -> str:
-        type, args = match.groups()
-        args = args.strip()
-        if type == "note":
-            return _caf_note_block(args, page, config)
+    return patterns.SHORTCODE.sub(replace, markdown)
 
-        raise RuntimeError(f"Unknown shortcode caf:{type}")
+def _module_shortcode(type: str, args: str, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Replace a module shortcode.'''
 
-    # Replace CAF note shortcodes.
-    return re.sub(
-        r"<!-- caf:(\w+)(.*?) -->",
-        replace, markdown, flags = re.I | re.M
-    )
+    if type == "version":
+        return badges.badge_for_version(args, page, files)
+    elif type == "rule":
+        return badges.badge_for_applies_to_rule(args, page, files)
+    elif type == "config":
+        return badges.badge_for_configuration(args)
+    elif type == "resource":
+        return ''
 
-def _relative_uri(path: str, page: Page, files: Files) -> str:
-    '''Get relative URI for a file including anchor.'''
+    raise RuntimeError(f"Unknown shortcode module:{type}")
 
-    path, anchor, *_ = f"{path}#".split("#")
-    path = _relative_path(files.get_file_from_path(path), page)
-    return "#".join([path, anchor]) if anchor else path
+def _external_shortcode(type: str, args: str, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Replace an external shortcode.'''
 
-def _relative_path(file: File, page: Page) -> str:
-    '''Get relative source path for a file to a page.'''
+    if type == "avm":
+        return _external_reference_avm(args, page)
 
-    path = os.path.relpath(file.src_uri, page.file.src_uri)
-    return os.path.sep.join(path.split(os.path.sep)[1:])
+    raise RuntimeError(f"Unknown shortcode external:{type}")
 
-def _badge(icon: str, text: str = "") -> str:
-    '''Create span block for a badge.'''
+def _security_shortcode(type: str, args: str, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Replace a security note shortcode.'''
 
-    classes = "badge"
-    return "".join([
-        f"<span class=\"{classes}\">",
-        *([f"<span class=\"badge__icon\">{icon}</span>"] if icon else []),
-        *([f"<span class=\"badge__text\">{text}</span>"] if text else []),
-        f"</span>",
-    ])
+    if type == "note":
+        return _security_note_block(args, page, config)
 
-def _badge_for_version(text: str, page: Page, files: Files) -> str:
-    '''Create badge for minimum version.'''
+    raise RuntimeError(f"Unknown shortcode security:{type}")
 
-    # Get place in changelog.
-    version = text
-    major = version.split('.')[0]
-    anchor = version.replace('.', '')
-    path = f"changelog.md#{anchor}"
+def _deprecation_shortcode(type: str, args: str, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Replace a deprecation note shortcode.'''
 
-    icon = "octicons-milestone-24"
-    href = _relative_uri(path, page, files)
-    return _badge(
-        icon = f"[:{icon}:]({href} 'Minimum version')",
-        text = f"[{text}]({href})"
-    )
+    if type == "note":
+        return _deprecation_note_block(args, page, config)
 
-def _badge_for_applies_to_rule(text: str, page: Page, files: Files) -> str:
-    '''Create a badge for linking to a related rule.'''
+    raise RuntimeError(f"Unknown shortcode deprecation:{type}")
 
-    path = f"en/rules/{text}.md"
+def _caf_shortcode(type: str, args: str, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Replace a CAF note shortcode.'''
 
-    icon = "octicons-link-24"
-    href = _relative_uri(path, page, files)
-    return _badge(
-        icon = f"[:{icon}:]({href} 'Applies to rule')",
-        text = f"[{text}]({href})"
-    )
+    if type == "note":
+        return _caf_note_block(args, page, config)
 
-def _badge_for_configuration(text: str, page: Page, files: Files) -> str:
-    '''Create a badge for linking to a configuration setting.'''
+    raise RuntimeError(f"Unknown shortcode caf:{type}")
 
-    config_type = text.split(' ')[0]
-    config_value = text.split(' ')[1]
-    path = ""
-    if config_type == "rule":
-        path = f"../../setup/configuring-rules.md#{config_value.lower()}"
+def caf_note(markdown: str, page: Page, config: MkDocsConfig, files: Files) -> str:
+    '''Replace CAF notes shortcodes in markdown.'''
 
-    if config_type == "expand":
-        path = f"../../setup/configuring-expansion.md#{config_value.lower()}"
+    return replace_shortcodes(markdown, { 'caf': _caf_shortcode }, page, config, files)
 
-    icon = "octicons-gear-24"
-    href = path
-    text = config_value
-    return _badge(
-        icon = f"[:{icon}:]({href} 'Applies to configuration setting')",
-        text = f"[{text}]({href})"
-    )
+# Shortcode handlers that are replaced on every page, keyed by namespace.
+SHORTCODE_HANDLERS = {
+    'module': _module_shortcode,
+    'external': _external_shortcode,
+    'security': _security_shortcode,
+    'deprecation': _deprecation_shortcode,
+}
 
 def _reference_block(style: str, title: str, text: str = "") -> str:
     '''Add an external reference block.'''
@@ -263,37 +201,91 @@ def _avm_module_latest_tag(page: Page, name: str) -> str:
 
     log.debug(f"Loading avm module versions page: {page.abs_url}")
 
+    path = os.path.dirname(page.file.abs_src_path)
+    return dependencies.record(('avm', path, name), _avm_latest(path, name), page)
+
+def _avm_latest(path: str, name: str) -> str:
+    '''Get the latest version of an AVM module from avm_versions.json in a directory.'''
+
     latest = ''
 
-    file: str = os.path.join(os.path.dirname(page.file.abs_src_path), 'avm_versions.json')
+    data = _avm_versions(path)
+    if data.get(name, None) != None and data[name].get('Latest', None) != None:
+        latest = data[name]['Latest']
+
+    return latest
+
+def _avm_versions(path: str) -> dict:
+    '''Get AVM module versions for a directory, reloading if avm_versions.json has changed.'''
+
+    file: str = os.path.join(path, 'avm_versions.json')
+    mtime = os.path.getmtime(file)
+
+    cached = avm_versions_cache.get(path, None)
+    if cached != None and cached[0] == mtime:
+        avm_versions_stats['hits'] += 1
+        return cached[1]
+
+    avm_versions_stats['misses'] += 1
     with open(file) as f:
         data = json.load(f)
-        if data.get(name, None) != None and data[name].get('Latest', None) != None:
-            latest = data[name]['Latest']
 
-    return latest
+    avm_versions_cache[path] = (mtime, data)
+    return data
 
-def _find_include_for_culture(config: MkDocsConfig, culture: str, path: str) -> str:
-    '''Find the markdown include file for a specific culture.'''
-    defaultCulture = config.theme.locale
-    culture = culture.lower()
+def load_includes(config: MkDocsConfig):
+    '''Index include files for each culture, resolving the default culture as a fallback.'''
+
+    includes.clear()
+    defaultCulture = str(config.theme.locale).lower()
 
     # Get the repo root path.
     repo_root_dir = os.path.join(config.docs_dir, "..")
+    includes_dir = os.path.join(repo_root_dir, "includes")
+
+    # Read each include file once.
+    cultures = {}
+    for culture in os.listdir(includes_dir):
+        culture_dir = os.path.join(includes_dir, culture)
+        if not os.path.isdir(culture_dir):
+            continue
+
+        content = {}
+        for root, _, names in os.walk(culture_dir):
+            for name in names:
+                file = os.path.join(root, name)
+                with open(file, 'r', encoding='utf-8') as f:
+                    content[os.path.relpath(file, culture_dir).replace(os.path.sep, '/')] = f.read()
+
+        cultures[culture.lower()] = content
+
+    # Any include missing for a culture uses the include from the default culture.
+    fallback = cultures.get(defaultCulture, {})
+    for culture, content in cultures.items():
+        for path, value in { **fallback, **content }.items():
+            includes[(culture, path)] = value
+
+    for path, value in fallback.items():
+        includes[(None, path)] = value
+
+def _find_include_for_culture(config: MkDocsConfig, culture: str, path: str, page: Page) -> str:
+    '''Find the markdown include file for a specific culture.'''
+    culture = str(culture).lower()
+
+    content = _get_include(culture, path)
+    if content != None:
+        return dependencies.record(('include', culture, path), content, page)
 
-    # Find the include file for the culture.
-    includeFile = f"{repo_root_dir}/includes/{culture}/{path}"
-    fallbackFile = f"{repo_root_dir}/includes/{defaultCulture}/{path}"
+    raise RuntimeError(f"Unknown include '{path}' not found for culture '{culture}' or '{config.theme.locale}'.")
 
-    # If the path exists load the contents from disk.
-    if os.path.exists(includeFile) and os.path.isfile(includeFile):
-        return io.open(includeFile, 'r', encoding='utf-8').read()
+def _get_include(culture: str, path: str) -> str | None:
+    '''Get the content of an include for a culture, using the include from the default culture if the culture does not have one.'''
 
-    # If the path does not exist, try the default culture.
-    if os.path.exists(fallbackFile) and os.path.isfile(fallbackFile):
-        return io.open(fallbackFile, 'r', encoding='utf-8').read()
+    content = includes.get((culture, path), None)
+    if content == None:
+        content = includes.get((None, path), None)
 
-    raise RuntimeError(f"Unknown include '{path}' not found at '{includeFile}' or '{fallbackFile}'.")
+    return content
 
 def _get_culture_from_page(page: Page, config: MkDocsConfig) -> str:
     '''Get the culture from the page file path.'''
@@ -314,7 +306,7 @@ def _security_note_block(text: str, page: Page, config: MkDocsConfig) -> str:
     culture = _get_culture_from_page(page, config)
     name = text.split(' ')[0]
 
-    return _find_include_for_culture(config, culture, f"security-notes/{name}.md")
+    return _find_include_for_culture(config, culture, f"security-notes/{name}.md", page)
 
 
 def _caf_note_block(text: str, page: Page, config: MkDocsConfig) -> str:
@@ -323,7 +315,7 @@ def _caf_note_block(text: str, page: Page, config: MkDocsConfig) -> str:
     culture = _get_culture_from_page(page, config)
     name = text.split(' ')[0]
 
-    return _find_include_for_culture(config, culture, f"caf-notes/{name}.md")
+    return _find_include_for_culture(config, culture, f"caf-notes/{name}.md", page)
 
 def _deprecation_note_block(text: str, page: Page, config: MkDocsConfig) -> str:
     '''Create a deprecation note block.'''
@@ -0,0 +1,96 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# Tests that pages using a changed dependency have their built output removed, so a dirty build renders them again.
+
+import os
+
+from types import SimpleNamespace
+
+import pytest
+
+import dependencies
+import samples
+
+class StubPage:
+    '''Stub for Page with the built output path used by dependencies.'''
+
+    def __init__(self, path: str):
+        self.file = SimpleNamespace(abs_dest_path = path)
+
+@pytest.fixture(autouse = True)
+def reset(monkeypatch):
+    monkeypatch.setattr(dependencies, "dependents", {})
+    monkeypatch.setattr(dependencies, "values", {})
+    monkeypatch.setattr(samples, "toc_fragments", {})
+    monkeypatch.setattr(samples, "sample_properties", {})
+
+def _built_page(tmp_path, name: str) -> StubPage:
+    '''Create built output for a page.'''
+
+    path = tmp_path / "site" / name / "index.html"
+    path.parent.mkdir(parents = True)
+    path.write_text("<html></html>", encoding = "utf-8")
+    return StubPage(str(path))
+
+def test_invalidate_changed(tmp_path):
+    current = { 'a': 1, 'b': 2 }
+    first = _built_page(tmp_path, "first")
+    second = _built_page(tmp_path, "second")
+    other = _built_page(tmp_path, "other")
+
+    assert dependencies.record(('test', 'a'), 1, first) == 1
+    dependencies.record(('test', 'a'), 1, second)
+    dependencies.record(('test', 'b'), 2, other)
+    dependencies.record(('other', 'a'), 1, other)
+
+    current['a'] = 3
+    assert dependencies.invalidate('test', lambda name: current[name]) == 2
+    assert not os.path.exists(first.file.abs_dest_path)
+    assert not os.path.exists(second.file.abs_dest_path)
+    assert os.path.exists(other.file.abs_dest_path)
+
+    # Dependencies are recorded again when the pages are rendered again.
+    assert ('test', 'a') not in dependencies.values
+    assert ('test', 'b') in dependencies.values
+    assert ('other', 'a') in dependencies.values
+
+def test_invalidate_unchanged(tmp_path):
+    page = _built_page(tmp_path, "page")
+    dependencies.record(('test', 'a'), 1, page)
+
+    assert dependencies.invalidate('test', lambda name: 1) == 0
+    assert dependencies.invalidate('other', lambda name: 2) == 0
+    assert os.path.exists(page.file.abs_dest_path)
+
+def test_invalidate_removed_output(tmp_path):
+    page = _built_page(tmp_path, "page")
+    dependencies.record(('test', 'a'), 1, page)
+    os.remove(page.file.abs_dest_path)
+
+    assert dependencies.invalidate('test', lambda name: 2) == 0
+    assert ('test', 'a') not in dependencies.values
+
+def test_invalidate_samples(tmp_path):
+    '''Check pages listing samples are removed when the README.md of a sample changes.'''
+
+    readme = tmp_path / "samples" / "rules" / "Example" / "README.md"
+    readme.parent.mkdir(parents = True)
+    (tmp_path / "samples" / "baselines").mkdir()
+    (tmp_path / "samples" / "suppression").mkdir()
+    (tmp_path / "docs").mkdir()
+    readme.write_text("# Example\n\nFirst description.\n", encoding = "utf-8")
+    config = SimpleNamespace(docs_dir = str(tmp_path / "docs"), repo_url = "https://github.com/Azure/PSRule.Rules.Azure/")
+
+    samples.on_pre_build(config)
+    page = _built_page(tmp_path, "samples")
+    assert "First description." in samples.samples_shortcode("<!-- samples:rules -->", page, config, None)
+
+    samples.on_pre_build(config)
+    assert os.path.exists(page.file.abs_dest_path)
+
+    readme.write_text("# Example\n\nSecond description.\n", encoding = "utf-8")
+    os.utime(readme, (0, os.path.getmtime(readme) + 1))
+    samples.on_pre_build(config)
+    assert not os.path.exists(page.file.abs_dest_path)
@@ -0,0 +1,92 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# Golden file tests for rewriting headings, tags, markers, and code fences in old_hooks.
+# Each fixture in fixtures/ is rewritten as a page at the source path of its case and compared with the .expected file.
+# Fixtures in fixtures/rules/ are copies of real rule pages for each locale, and other fixtures cover cases those pages do not.
+# Expected files were generated with the chain of replacements that old_hooks used before it was rewritten in one pass.
+
+import glob
+import os
+
+import pytest
+
+from mkdocs.utils import meta
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+SITE_URL = "https://azure.github.io/PSRule.Rules.Azure"
+
+# Source path of the page, and metadata loaded for rule pages, for each fixture.
+CASES = {
+    'rule': ("en/rules/Azure.Test.Rule.md", {
+        'rule': "Azure.Test.Rule",
+        'ref': "AZR-000001",
+        'level': "Error",
+        'release': "preview",
+        'ruleSet': "2024_01",
+        'source': "https://github.com/Azure/PSRule.Rules.Azure/blob/main/src/PSRule.Rules.Azure/rules/Azure.Test.Rule.yaml",
+    }),
+    'baseline': ("en/baselines/Azure.Test.md", {}),
+    'concept': ("concepts/about_PSRule_Azure_Configuration.md", {}),
+    'guide': ("setup/index.md", {}),
+}
+
+def _rule_metadata(name: str) -> dict:
+    '''Get metadata loaded for a copy of a real rule page.'''
+
+    return {
+        'rule': name,
+        'ref': "AZR-000001",
+        'level': "Error",
+        'release': "GA",
+        'ruleSet': "2024_06",
+        'source': f"https://github.com/Azure/PSRule.Rules.Azure/blob/main/src/PSRule.Rules.Azure/rules/{name}.Rule.yaml",
+    }
+
+for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "rules", "*", "*.md"))):
+    locale = os.path.basename(os.path.dirname(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    CASES[f"rules/{locale}/{name}"] = (f"{locale}/rules/{name}.md", _rule_metadata(name))
+
+class StubFile:
+    '''Stub for File with the properties used by old_hooks.'''
+
+    def __init__(self, src_path: str):
+        self.src_path = src_path
+        self.src_uri = src_path
+
+class StubFiles:
+    '''Stub for Files that resolves any path.'''
+
+    def get_file_from_path(self, path: str) -> StubFile:
+        return StubFile(path)
+
+class StubPage:
+    '''Stub for Page with the properties used by old_hooks.'''
+
+    def __init__(self, src_path: str, page_meta: dict, psrule: dict):
+        self.file = StubFile(src_path)
+        self.meta = page_meta
+        self.url = f"{os.path.splitext(src_path)[0]}/"
+        self.canonical_url = f"{SITE_URL}/{self.url}"
+        self.__annotations__ = { '__psrule__': psrule }
+
+def rewrite(on_page_markdown, name: str) -> str:
+    '''Rewrite a fixture with an on_page_markdown hook, using line feeds for line breaks.'''
+
+    src_path, psrule = CASES[name]
+    with open(os.path.join(FIXTURES_DIR, f"{name}.md"), encoding = "utf-8") as f:
+        markdown, page_meta = meta.get_data(f.read())
+
+    page = StubPage(src_path, page_meta, dict(psrule))
+    return on_page_markdown(markdown, page, None, StubFiles()).replace("\r", "\n")
+
+@pytest.mark.parametrize("name", CASES.keys())
+def test_on_page_markdown(name: str):
+    import old_hooks
+
+    with open(os.path.join(FIXTURES_DIR, f"{name}.expected"), encoding = "utf-8") as f:
+        expected = f.read()
+
+    assert rewrite(old_hooks.on_page_markdown, name) == expected
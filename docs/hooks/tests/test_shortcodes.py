@@ -0,0 +1,31 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# Tests that shortcodes are replaced in a single pass, including shortcodes within multi-line deprecation notes.
+
+import shortcodes
+
+def _replace(markdown: str) -> str:
+    '''Replace shortcodes that do not depend on the page or configuration.'''
+
+    return shortcodes.replace_shortcodes(markdown, shortcodes.SHORTCODE_HANDLERS, None, None, None)
+
+def test_deprecation_note():
+    markdown = "# Title\n\n<!-- deprecation:note\nFirst line.\nSecond line.\n-->\n\nBody.\n"
+
+    assert _replace(markdown) == "# Title\n\n!!! Info \"Deprecation\"\n    First line.\n    Second line.\n\nBody.\n"
+
+def test_deprecation_note_with_shortcodes():
+    '''Check shortcodes in a deprecation note are replaced and indented with the note, like replacing each kind in turn.'''
+
+    badge = _replace("{{ module:config rule AZURE_EXAMPLE }}")
+    markdown = "<!-- deprecation:note\nSet {{ module:config rule AZURE_EXAMPLE }}.\n<!-- module:resource Example -->\nLast line.\n-->\nAfter.\n<!-- module:resource Other -->"
+
+    assert badge.startswith("<span class=\"badge\">")
+    assert _replace(markdown) == f"!!! Info \"Deprecation\"\n    Set {badge}.\n    \n    Last line.\nAfter.\n"
+
+def test_unknown_namespace():
+    markdown = "<!-- unknown:type args -->\n<!-- deprecation:note Text -->"
+
+    assert _replace(markdown) == "<!-- unknown:type args -->\n!!! Info \"Deprecation\"\n    Text"
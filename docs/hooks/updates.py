@@ -7,14 +7,19 @@
 import logging
 import re
 import semver
+import frontmatter
+import patterns
 
 from mkdocs.config.defaults import MkDocsConfig
-from mkdocs.structure.files import Files
+from mkdocs.structure.files import File, Files
 from mkdocs.structure.pages import Page
 from mkdocs.structure.nav import Section, Navigation, _add_parent_links
 
 log = logging.getLogger(f"mkdocs")
 
+# Parsed versions of update pages, keyed by source path.
+update_versions: dict[str, semver.VersionInfo] = {}
+
 #
 # Hooks
 #
@@ -47,6 +52,9 @@ def add_updates_to_nav(nav: Navigation, config: MkDocsConfig, files: Files):
     section: Section = next(
         x for x in nav if x.title == "Updates")
 
+    # Pages that already exist in section children.
+    existing = set(child.file.src_path for child in section.children if isinstance(child, Page))
+
     # Get the list of files that are update pages.
     children = []
     for f in files:
@@ -54,7 +62,7 @@ def add_updates_to_nav(nav: Navigation, config: MkDocsConfig, files: Files):
             continue
 
         # Check if the page already exists in section children that are Page.
-        if any(isinstance(child, Page) and child.file.src_path == f.src_path for child in section.children):
+        if f.src_path in existing:
             continue
 
         destPath = f._get_dest_path(False)
@@ -62,17 +70,14 @@ def add_updates_to_nav(nav: Navigation, config: MkDocsConfig, files: Files):
             continue
 
         # Preview the metadata to check if the page is a draft.
-        p = Page(None, f, config)
-        p.read_source(config)
-        if p.meta.get('draft', False) == True:
+        if frontmatter.get_frontmatter(f).get('draft', False) == True:
             log.info(f"Skipping {f.src_path} because it is a draft.")
             continue
 
         children.append(f)
 
     # Sort by semver version string.
-    children.sort(key=lambda x: semver.VersionInfo.parse(
-        x.src_path.split('/')[-1].replace(".md", ".0").replace("v", "")), reverse=False)
+    children.sort(key=_update_version, reverse=False)
 
     # Add the more recent 10 updates to the nav.
     for child in children[:10]:
@@ -92,7 +97,7 @@ def add_update_version_to_title(markdown: str, page: Page) -> str:
     if not version:
         return markdown
 
-    title = re.search(r"^# (.+)$", markdown, flags=re.M).group(1)
+    title = patterns.TITLE_HEADING.search(markdown).group(1)
     page.title = F"{title} (version {version})"
 
     if not page.meta.get('description', None):
@@ -105,7 +110,7 @@ def add_update_version_to_title(markdown: str, page: Page) -> str:
 def update_shortcodes(markdown: str, page: Page) -> str:
     '''Update shortcodes in the markdown for update pages.'''
 
-    if not is_update_page(page.canonical_url):
+    if not is_update_page(page.canonical_url) or not '<!--' in markdown:
         return markdown
 
     # Callback for regular expression replacement.
@@ -118,15 +123,23 @@ def update_shortcodes(markdown: str, page: Page) -> str:
         raise RuntimeError(f"Unknown shortcode update:{type}")
 
     # Replace update shortcodes.
-    return re.sub(
-        r"<!-- update:(\w+)(.*?) -->",
-        replace, markdown, flags = re.I | re.M
-    )
+    return patterns.UPDATE_SHORTCODE.sub(replace, markdown)
 
 def is_update_page(path: str) -> bool:
     return path.__contains__("updates/v")
 
 
+def _update_version(file: File) -> semver.VersionInfo:
+    '''Get the version of an update page from the file name.'''
+
+    version = update_versions.get(file.src_path, None)
+    if version == None:
+        version = semver.VersionInfo.parse(file.src_path.split('/')[-1].replace(".md", ".0").replace("v", ""))
+        update_versions[file.src_path] = version
+
+    return version
+
+
 def _note_for_fix(version: str, page: Page) -> str:
     '''Generate a note for a fix.'''
 
@@ -3,19 +3,28 @@
 
 # NOTES:
 # This module implements a pygments lexer for Bicep.
+# Pygments imports this module to list lexers, so importing it must stay cheap.
+# Patterns are compiled when the lexer is first used, and modules only needed by the cache are imported on first use.
 
 # Local testing:
 # To test the lexer, you can use the following code snippet:
 # pygmentize -l bicep docs/examples/resources/keyvault.bicep
 
+import bisect
 import logging
+import os
+import re
 
+from collections import OrderedDict
+
+from pygments import __version__ as pygments_version
 from pygments.lexer import RegexLexer, bygroups, words, include
-from pygments.token import Comment, Operator, Keyword, Name, String, Number, Punctuation, Whitespace
+from pygments.token import Comment, Operator, Keyword, Name, String, Number, Punctuation, Whitespace, Error, _TokenType, string_to_tokentype
+from pygments.util import get_bool_opt
 
 log = logging.getLogger(f"mkdocs")
 
-__all__ = ['BicepLexer',]
+__all__ = ['BicepLexer', 'IncrementalLexer', 'TokenCache', 'stream_tokens', 'token_cache',]
 
 BICEP_KEYWORDS = [
     'metadata', 'targetScope', 'for', 'in', 'if', 'existing', 'as', 'with', 'extends', 'assert', 'extension',
@@ -27,32 +36,175 @@ BICEP_DECORATORS = [
     'secure', 'metadata', 'description', 'export', 'maxLength', 'minLength', 'allowed'
 ]
 
+# A transition used for new lines not matched by any rule, which reset the state stack to root.
+_ROOT = '#root'
+
+# An action used for runs of characters not matched by any rule, which are emitted as errors.
+_ERRORS = '#errors'
+
+# Versions of pygments that merged patterns are used with, from the minimum version up to but not including the maximum.
+# Merged patterns depend on how RegexLexer processes rules, so other versions use the standard RegexLexer implementation.
+PYGMENTS_VERSIONS = ((2, 12), (3, 0))
+
+# The token type of each group for callbacks created by _bygroups, used to emit groups directly from a merged match.
+_group_tokens = {}
+
+class TokenCache:
+    '''A cache of tokens for Bicep sources keyed by a hash of the source.
+
+    Recently used entries are kept in memory up to maxsize entries and maxtokens tokens in total.
+    Sources longer than maxlength characters are not cached, so they are lexed as a stream instead.
+    When a path is set, entries are also written to the directory so that they can be used by later processes.
+    '''
+
+    def __init__(self, maxsize: int = 1024, path: str = None, maxlength: int = 65536, maxtokens: int = 1048576):
+        self.maxsize = maxsize
+        self.maxlength = maxlength
+        self.maxtokens = maxtokens
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._entries = OrderedDict()
+        self._tokens = 0
+
+    def accepts(self, text: str) -> bool:
+        '''Check if tokens for a source can be cached, counting sources that are too long to cache.'''
+
+        if len(text) <= self.maxlength:
+            return True
+
+        self.skipped += 1
+        return False
+
+    def get_key(self, text: str, stack: tuple, rules: str = '') -> str:
+        '''Get the key for a source, the initial state stack, and a fingerprint of the lexer rules.'''
+
+        import hashlib
+        return hashlib.sha256(f"{rules}\0{'/'.join(stack)}\0{text}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> list | None:
+        '''Get the tokens for a key, or None if the key is not cached.'''
+
+        tokens = self._entries.get(key, None)
+        if tokens != None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return tokens
+
+        tokens = self._read(key)
+        if tokens != None:
+            self._add(key, tokens)
+            self.disk_hits += 1
+            return tokens
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, tokens: list):
+        '''Add the tokens for a key to the cache.'''
+
+        self._add(key, tokens)
+        self._write(key, tokens)
+
+    def clear(self):
+        '''Remove all entries from memory and reset statistics.'''
+
+        self._entries.clear()
+        self._tokens = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0
+
+    def stats(self) -> dict[str, int]:
+        '''Get statistics for the cache.'''
+
+        return { 'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'skipped': self.skipped, 'size': len(self._entries), 'tokens': self._tokens }
+
+    def _add(self, key: str, tokens: list):
+        '''Add tokens to memory, removing the least recently used entries when full.'''
+
+        previous = self._entries.pop(key, None)
+        if previous != None:
+            self._tokens -= len(previous)
+
+        self._entries[key] = tokens
+        self._tokens += len(tokens)
+        while len(self._entries) > self.maxsize or (self._tokens > self.maxtokens and len(self._entries) > 1):
+            _, removed = self._entries.popitem(last=False)
+            self._tokens -= len(removed)
+
+    def _read(self, key: str) -> list | None:
+        '''Read tokens for a key from the cache directory.'''
+
+        if self.path == None:
+            return None
+
+        import json
+        try:
+            with open(os.path.join(self.path, f"{key}.json"), encoding='utf-8') as f:
+                return [(pos, string_to_tokentype(token), value) for pos, token, value in json.load(f)]
+
+        # A missing or unreadable entry is treated as not cached.
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, tokens: list):
+        '''Write tokens for a key to the cache directory.'''
+
+        if self.path == None:
+            return
+
+        # Entries are written to a temporary file first so that concurrent readers never see partial entries.
+        import json
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            file = os.path.join(self.path, f"{key}.json")
+            with open(f"{file}.{os.getpid()}.tmp", 'w', encoding='utf-8') as f:
+                json.dump([(pos, str(token), value) for pos, token, value in tokens], f)
+
+            os.replace(f"{file}.{os.getpid()}.tmp", file)
+
+        except OSError as e:
+            log.debug(f"Failed to write Bicep token cache entry: {e}")
+
+# Tokens shared by all lexers that use the cache.
+# Set the BICEP_SYNTAX_CACHE_DIR environment variable to also keep tokens on disk between processes.
+token_cache = TokenCache(path=os.environ.get('BICEP_SYNTAX_CACHE_DIR', None))
+
+def _bygroups(*tokens):
+    '''Create a bygroups callback, keeping the token type of each group for the fast lexer mode.'''
+
+    callback = bygroups(*tokens)
+    _group_tokens[callback] = tokens
+    return callback
+
 class BicepLexer(RegexLexer):
     '''A lexer for Bicep.'''
     name = 'Bicep'
     aliases = ['bicep']
     filenames = ['*.bicep']
 
-    log.warning(f"Loading Bicep lexer")
-
     tokens = {
         'root': [
             (words(['import', 'using'], suffix=' '), Keyword.Namespace),
 
-            (r'^(param)(\s)(\w+)(\s)(\w+)', bygroups(Keyword.Declaration, Whitespace, Name.Symbol, Whitespace, Name.Type), 'param'),
-            (r'^(output)(\s)(\w+)(\s)(\w+)', bygroups(Keyword.Declaration, Whitespace, Name.Symbol, Whitespace, Name.Type), 'output'),
+            (r'^(param)(\s)(\w+)(\s)(\w+)', _bygroups(Keyword.Declaration, Whitespace, Name.Symbol, Whitespace, Name.Type), 'param'),
+            (r'^(output)(\s)(\w+)(\s)(\w+)', _bygroups(Keyword.Declaration, Whitespace, Name.Symbol, Whitespace, Name.Type), 'output'),
 
-            (r'^(resource)(\s)(\w+)', bygroups(Keyword.Declaration, Whitespace, Name.Symbol), 'resource'),
-            (r'^(module)(\s)(\w+)', bygroups(Keyword.Declaration, Whitespace, Name.Symbol), 'module'),
+            (r'^(resource)(\s)(\w+)', _bygroups(Keyword.Declaration, Whitespace, Name.Symbol), 'resource'),
+            (r'^(module)(\s)(\w+)', _bygroups(Keyword.Declaration, Whitespace, Name.Symbol), 'module'),
 
             (words(BICEP_DECLARATIONS, suffix=' ', prefix='\n'), Keyword.Declaration),
-            (r'^(\@)(secure|metadata|description|export|maxLength|minLength|allowed)(\()', bygroups(Keyword.Decorator, Keyword.Decorator, Punctuation), 'decorator'),
+            (r'^(\@)(secure|metadata|description|export|maxLength|minLength|allowed)(\()', _bygroups(Keyword.Decorator, Keyword.Decorator, Punctuation), 'decorator'),
             (words(BICEP_KEYWORDS, suffix=r'\b'), Keyword),
 
             include('core'),
         ],
         'core': [
-            (r'(\[)(for)', bygroups(Punctuation, Keyword), 'loop'),
+            (r'(\[)(for)', _bygroups(Punctuation, Keyword), 'loop'),
             include('comments'),
             include('complex'),
             include('literal'),
@@ -100,7 +252,7 @@ class BicepLexer(RegexLexer):
             include('core'),
         ],
         'object': [
-            (r'(\s+)(\w+)(\:)', bygroups(Whitespace, Name.Property, Punctuation)),
+            (r'(\s+)(\w+)(\:)', _bygroups(Whitespace, Name.Property, Punctuation)),
             (r'\s+', Whitespace),
             (r'\}', Punctuation, '#pop'),
             include('core'),
@@ -135,3 +287,394 @@ class BicepLexer(RegexLexer):
             include('literal'),
         ]
     }
+
+    # The merged pattern and rules for each state, built on first use by the fast lexer mode.
+    _merged = None
+
+    # A hash of the rules, built on first use of the cache so that cached tokens are not used after the rules change.
+    _fingerprint = None
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.fast = get_bool_opt(options, 'fast', True)
+        self.cache = token_cache if get_bool_opt(options, 'cache', True) else None
+
+    def get_tokens_unprocessed(self, text, stack=('root',)):
+        '''Split text into tokens, using tokens from the cache for a source that has already been lexed.'''
+
+        # Iterators are returned rather than yielded from, so each token does not pass through another generator.
+        # Sources that are too long to cache are streamed, so the first tokens are available without lexing the whole source.
+        if self.cache == None or not self.cache.accepts(text):
+            return self._lex(text, stack)
+
+        key = self.cache.get_key(text, stack, self._get_fingerprint())
+        tokens = self.cache.get(key)
+        if tokens == None:
+            tokens = list(self._lex(text, stack))
+            self.cache.set(key, tokens)
+
+        return iter(tokens)
+
+    def _lex(self, text, stack):
+        '''Split text into tokens, trying the rules of each state with a single merged pattern unless the fast option is disabled.'''
+
+        if not self.fast:
+            return super().get_tokens_unprocessed(text, stack)
+
+        return self._scan(text, list(stack))
+
+    def _scan(self, text: str, statestack: list[str], pos: int = 0, checkpoints: list = None, every: bool = False):
+        '''Split text into tokens from a position, updating the state stack in place.
+
+        When a list of checkpoints is provided, the position and state stack are added to the list each time a rule
+        is about to be matched at the start of a line, or before every match when every is set.
+        '''
+
+        states = self._get_merged()
+
+        # Without merged patterns, the rest of the text is lexed by RegexLexer from a single checkpoint.
+        if states == None:
+            if checkpoints != None:
+                checkpoints.append((pos, tuple(statestack)))
+
+            for token_pos, token, value in super().get_tokens_unprocessed(text[pos:], tuple(statestack)):
+                yield pos + token_pos, token, value
+
+            return
+
+        match, rules = states[statestack[-1]]
+        while True:
+            if checkpoints != None and (every or pos == 0 or text[pos - 1] == '\n'):
+                checkpoints.append((pos, tuple(statestack)))
+
+            m = match(text, pos)
+            if m == None:
+                break
+
+            action, new_state, rexmatch = rules[m.lastindex]
+            end = m.end()
+            if type(action) is _TokenType:
+                yield pos, action, text[pos:end]
+
+            # Groups are emitted from the merged match for rules using bygroups with token types.
+            elif type(action) is tuple:
+                for group, token in action:
+                    value = m.group(group)
+                    if value:
+                        yield m.start(group), token, value
+
+            # Runs of characters not matched by any rule are emitted one character at a time like RegexLexer.
+            elif action == _ERRORS:
+                for i in range(pos, end):
+                    yield i, Error, text[i]
+
+            # Other callbacks expect group numbers of the original rule, so the rule is matched again.
+            elif action != None:
+                yield from action(self, rexmatch(text, pos))
+
+            pos = end
+            if new_state == None:
+                continue
+
+            # Transitions follow the same rules as RegexLexer, including the reset to root for an unmatched new line.
+            if type(new_state) is int:
+                if -new_state >= len(statestack):
+                    del statestack[1:]
+                else:
+                    del statestack[new_state:]
+            elif new_state == _ROOT:
+                statestack[:] = ['root']
+            elif isinstance(new_state, tuple):
+                for state in new_state:
+                    if state == '#pop':
+                        if len(statestack) > 1:
+                            statestack.pop()
+                    elif state == '#push':
+                        statestack.append(statestack[-1])
+                    else:
+                        statestack.append(state)
+            elif new_state == '#push':
+                statestack.append(statestack[-1])
+
+            match, rules = states[statestack[-1]]
+
+    @classmethod
+    def _get_merged(cls) -> dict | None:
+        '''Get a single pattern for each state that tries the rules of the state in order, or None if not supported.'''
+
+        # An empty table is kept when merged patterns are not supported, so the check only happens once.
+        # Tables are kept for each class, so subclasses with different rules do not use the rules of this class.
+        if cls.__dict__.get('_merged', None) == None:
+            cls._merged = cls._merge()
+
+        return cls._merged or None
+
+    @classmethod
+    def _merge(cls) -> dict:
+        '''Build a single pattern for each state, returning an empty table if the version of pygments is not supported.'''
+
+        version = tuple(int(part) for part in re.findall(r'\d+', pygments_version)[:2])
+        if version < PYGMENTS_VERSIONS[0] or version >= PYGMENTS_VERSIONS[1]:
+            log.warning(f"Bicep lexer does not support merged patterns with pygments {pygments_version}, using RegexLexer.")
+            return {}
+
+        log.debug(f"Compiling Bicep lexer")
+        if '_tokens' not in cls.__dict__:
+            cls._tokens = cls.process_tokendef('', cls.get_tokendefs())
+
+        merged = {}
+        for state, statetokens in cls._tokens.items():
+            alternatives = []
+            rules = [None]
+            for rexmatch, action, new_state in statetokens:
+                pattern = rexmatch.__self__.pattern
+                groups = _get_groups(action, len(rules) - 1)
+
+                # Groups within a rule are only kept when they are emitted from the merged match.
+                if groups == None:
+                    pattern = _uncaptured(pattern)
+                else:
+                    rules.extend([None] * rexmatch.__self__.groups)
+
+                # Each rule ends with an empty group to identify it, so that each alternative still starts with the
+                # first character of the rule, which the regular expression engine can check before trying it.
+                alternatives.append(f'(?:{pattern})()')
+                rules.append((groups or action, new_state, rexmatch))
+
+            # Characters not matched by any rule are handled in the same pattern as RegexLexer would handle them.
+            # A new line resets the state to root, and other characters are matched as a run that is emitted as errors.
+            unmatched = '|'.join(alternatives)
+            alternatives.append(r'\n()')
+            rules.append((Whitespace, _ROOT, None))
+            alternatives.append(f'(?:(?!{_uncaptured(unmatched)})[^\n])+()')
+            rules.append((_ERRORS, None, None))
+
+            merged[state] = (re.compile('|'.join(alternatives), cls.flags).match, rules)
+
+        return merged
+
+    @classmethod
+    def _get_fingerprint(cls) -> str:
+        '''Get a hash of the rules of each state.'''
+
+        if cls.__dict__.get('_fingerprint', None) == None:
+            import hashlib
+            import json
+            rules = json.dumps(cls.tokens, sort_keys=True, default=_describe_rule)
+            cls._fingerprint = hashlib.sha256(rules.encode('utf-8')).hexdigest()
+
+        return cls._fingerprint
+
+class IncrementalLexer:
+    '''Keep tokens for a Bicep document up to date by only lexing the region around each edit.
+
+    Tokens are kept in checkpoints at the start of each line where a rule begins, with the state stack at that point.
+    After an edit, lexing restarts from the last checkpoint before the edit and stops at the first checkpoint after the
+    edit that has the same state stack as before, so the cost of an edit is proportional to the edit rather than the document.
+    '''
+
+    def __init__(self, text: str = '', lexer: BicepLexer = None):
+        self.lexer = lexer if lexer != None else BicepLexer(cache=False)
+        self.text = ''
+
+        # Each checkpoint is a list of the position, the state stack, and tokens with positions relative to the checkpoint.
+        self.checkpoints = []
+        self.update(0, 0, text)
+
+    @property
+    def tokens(self) -> list[tuple]:
+        '''Get all tokens for the document.'''
+
+        return list(self.get_tokens())
+
+    def get_tokens(self, start: int = 0, end: int = None):
+        '''Get tokens for the lines of the document between start and end.'''
+
+        checkpoints = self.checkpoints
+        for i in range(max(bisect.bisect_right(checkpoints, start, key=_position) - 1, 0), len(checkpoints)):
+            pos, _, tokens = checkpoints[i]
+            if end != None and pos >= end:
+                break
+
+            for offset, token, value in tokens:
+                yield pos + offset, token, value
+
+    def update(self, start: int, end: int, text: str) -> tuple[int, int]:
+        '''Replace the text between start and end, returning the range of the new text that was lexed again.'''
+
+        old_text = self.text
+        old_checkpoints = self.checkpoints
+        delta = len(text) - (end - start)
+        changed = start + len(text)
+        self.text = old_text[:start] + text + old_text[end:]
+
+        # Rules can look ahead to the end of the line after a token, so lexing restarts from the line before the edit.
+        line = old_text.rfind('\n', 0, start) + 1
+        if line > 0:
+            line = old_text.rfind('\n', 0, line - 1) + 1
+
+        i = bisect.bisect_right(old_checkpoints, line, key=_position) - 1
+        pos, stack = (old_checkpoints[i][0], old_checkpoints[i][1]) if i >= 0 else (0, ('root',))
+
+        checkpoints = old_checkpoints[:max(i, 0)]
+        pending = []
+        resync = None
+        for token_pos, token, value in self.lexer._scan(self.text, list(stack), pos, pending):
+            if pending:
+                resync = _add_checkpoints(pending, checkpoints, old_checkpoints, changed, delta)
+                if resync != None:
+                    break
+
+            checkpoint = checkpoints[-1]
+            checkpoint[2].append((token_pos - checkpoint[0], token, value))
+
+        else:
+            resync = _add_checkpoints(pending, checkpoints, old_checkpoints, changed, delta)
+
+        # Checkpoints after the point where lexing stopped are reused, moving them by the change in length.
+        if resync == None:
+            self.checkpoints = checkpoints
+            return pos, len(self.text)
+
+        for checkpoint in old_checkpoints[resync:]:
+            checkpoint[0] += delta
+
+        checkpoints.extend(old_checkpoints[resync:])
+        self.checkpoints = checkpoints
+        return pos, old_checkpoints[resync][0]
+
+def _get_groups(action, offset: int) -> tuple | None:
+    '''Get the group number and token type of each group for a callback created by _bygroups that only uses token types.'''
+
+    if not callable(action) or action not in _group_tokens:
+        return None
+
+    groups = []
+    for i, token in enumerate(_group_tokens[action]):
+        if token == None:
+            continue
+
+        if type(token) is not _TokenType:
+            return None
+
+        groups.append((offset + i + 1, token))
+
+    return tuple(groups)
+
+def _describe_rule(value) -> any:
+    '''Describe parts of a rule that are not JSON values, such as words and callbacks, in a way that is the same for each process.'''
+
+    if isinstance(value, words):
+        return value.get()
+
+    if value in _group_tokens:
+        return ['bygroups', _group_tokens[value]]
+
+    return getattr(value, '__qualname__', type(value).__name__)
+
+def stream_tokens(source, lexer: BicepLexer = None, chunk_size: int = 65536, lookahead: int = 4096):
+    '''Yield tokens for a Bicep file path or an iterable of text chunks, keeping only a few lines in memory at a time.
+
+    Tokens are the same as lexing the whole text with get_tokens_unprocessed, with positions from the start of the text.
+    Lines longer than lookahead characters, such as in minified templates, are split so that about lookahead characters
+    and one chunk are kept in memory, which assumes no rule matches or looks ahead further than lookahead characters.
+    '''
+
+    if lexer == None:
+        lexer = BicepLexer(cache=False)
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding='utf-8-sig') as f:
+            yield from stream_tokens(iter(lambda: f.read(chunk_size), ''), lexer, lookahead=lookahead)
+
+        return
+
+    # The buffer is lexed from start with the state stack at start. The character before start is kept after a cut, so
+    # rules that match at the start of a line are only tried when the cut was at the start of a line.
+    buffer = ''
+    offset = 0
+    start = 0
+    stack = ('root',)
+    for chunk in source:
+        buffer += chunk
+
+        # Rules can look ahead to the end of the line after a token, so tokens are emitted up to the start of the last
+        # complete line in the buffer, or up to lookahead characters before the end of the buffer if that is further.
+        # The rest of the buffer is lexed again once more text has been read.
+        last = buffer.rfind('\n')
+        limit = max(buffer.rfind('\n', 0, last) + 1 if last >= 0 else 0, len(buffer) - lookahead)
+        if limit <= start:
+            continue
+
+        tokens = []
+        pending = []
+        cut = None
+        for token in lexer._scan(buffer, list(stack), start, pending, True):
+            if pending:
+                for checkpoint in pending:
+                    if checkpoint[0] <= limit:
+                        cut = (len(tokens), *checkpoint)
+
+                if pending[-1][0] > limit:
+                    break
+
+                pending.clear()
+
+            tokens.append(token)
+
+        if cut == None or cut[1] <= start:
+            continue
+
+        count, pos, stack = cut
+        for i in range(count):
+            token_pos, token, value = tokens[i]
+            yield offset + token_pos, token, value
+
+        buffer = buffer[pos - 1:]
+        offset += pos - 1
+        start = 1
+
+    for token_pos, token, value in lexer._scan(buffer, list(stack), start):
+        yield offset + token_pos, token, value
+
+def _add_checkpoints(pending: list, checkpoints: list, old_checkpoints: list, changed: int, delta: int) -> int | None:
+    '''Add checkpoints found while lexing, returning the index of a previous checkpoint to resume from if one matches.'''
+
+    for pos, stack in pending:
+        if pos >= changed:
+            i = bisect.bisect_left(old_checkpoints, pos - delta, key=_position)
+            if i < len(old_checkpoints) and old_checkpoints[i][0] == pos - delta and old_checkpoints[i][1] == stack:
+                pending.clear()
+                return i
+
+        checkpoints.append([pos, stack, []])
+
+    pending.clear()
+    return None
+
+def _position(checkpoint: list) -> int:
+    '''Get the position of a checkpoint.'''
+
+    return checkpoint[0]
+
+def _uncaptured(pattern: str) -> str:
+    '''Replace capturing groups in a pattern with non-capturing groups.'''
+
+    result = []
+    escaped = False
+    charset = False
+    for i, c in enumerate(pattern):
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif charset:
+            charset = c != ']' or pattern[i - 1] == '['
+        elif c == '[':
+            charset = True
+        elif c == '(' and not pattern.startswith('?', i + 1):
+            c = '(?:'
+
+        result.append(c)
+
+    return ''.join(result)
@@ -0,0 +1,63 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# Tests that the token cache is bounded and that long sources are not cached.
+
+from pygments.token import Operator, Whitespace
+
+from lexer import BicepLexer, TokenCache
+
+SOURCE = "param name string = 'value'\n"
+
+def test_cache_hits():
+    lexer = BicepLexer()
+    lexer.cache = TokenCache()
+
+    expected = list(BicepLexer(cache = False).get_tokens_unprocessed(SOURCE))
+    assert list(lexer.get_tokens_unprocessed(SOURCE)) == expected
+    assert list(lexer.get_tokens_unprocessed(SOURCE)) == expected
+    assert lexer.cache.stats()['hits'] == 1
+    assert lexer.cache.stats()['misses'] == 1
+
+def test_long_sources_are_not_cached():
+    lexer = BicepLexer()
+    lexer.cache = TokenCache(maxlength = 100)
+
+    text = SOURCE * 10
+    assert list(lexer.get_tokens_unprocessed(text)) == list(BicepLexer(cache = False).get_tokens_unprocessed(text))
+    assert lexer.cache.stats()['skipped'] == 1
+    assert lexer.cache.stats()['size'] == 0
+
+def test_cache_is_bounded_by_tokens():
+    lexer = BicepLexer()
+    lexer.cache = TokenCache(maxtokens = 100)
+
+    for i in range(50):
+        list(lexer.get_tokens_unprocessed(f"// {i}\n{SOURCE}"))
+
+    stats = lexer.cache.stats()
+    assert stats['tokens'] <= 100
+    assert 0 < stats['size'] < 50
+
+def test_disk_entries_for_changed_rules(tmp_path):
+    '''Check tokens cached on disk are only used by lexers with the same rules.'''
+
+    class ChangedLexer(BicepLexer):
+        tokens = { **BicepLexer.tokens, 'param': [(r'\n', Whitespace, '#pop'), (r'\=', Operator.Word, '#pop')] }
+
+    lexer = BicepLexer()
+    lexer.cache = TokenCache(path = str(tmp_path))
+    list(lexer.get_tokens_unprocessed(SOURCE))
+
+    same = BicepLexer()
+    same.cache = TokenCache(path = str(tmp_path))
+    list(same.get_tokens_unprocessed(SOURCE))
+    assert same.cache.stats()['disk_hits'] == 1
+
+    changed = ChangedLexer()
+    changed.cache = TokenCache(path = str(tmp_path))
+    tokens = list(changed.get_tokens_unprocessed(SOURCE))
+    assert changed.cache.stats()['disk_hits'] == 0
+    assert changed.cache.stats()['misses'] == 1
+    assert (18, Operator.Word, '=') in tokens
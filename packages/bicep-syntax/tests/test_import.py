@@ -0,0 +1,57 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# Tests that importing the lexer stays cheap, since Pygments imports it to list lexers.
+# Import time is measured in a new process with python -X importtime, the same way as docs/hooks/benchmark.py.
+
+import os
+import subprocess
+import sys
+
+PACKAGE_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# The most time in milliseconds that importing the lexer can take, the same as --max-import-ms of the benchmark.
+MAX_IMPORT_MS = 5.0
+
+def _run_python(code: str, *options: str) -> list[str]:
+    '''Run code in a new process with the lexer on the path, returning import time lines and failing on other output.'''
+
+    # Bytecode is written on the first run, so later runs measure imports as they are after installing.
+    env = dict(os.environ, PYTHONPATH = os.path.abspath(PACKAGE_DIR))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    process = subprocess.run([sys.executable, *options, "-c", code], env = env, capture_output = True, text = True, check = True)
+    lines = []
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:"):
+            lines.append(line)
+        else:
+            assert line.strip() == "", f"Unexpected output when importing the lexer: {line}"
+
+    return lines
+
+def test_import_is_lazy():
+    '''Check listing lexers does not compile patterns or log.'''
+
+    _run_python("\n".join([
+        "from pygments.lexers import get_all_lexers",
+        "list(get_all_lexers())",
+        "import lexer",
+        "assert '_tokens' not in lexer.BicepLexer.__dict__ and lexer.BicepLexer._merged == None",
+    ]))
+
+def test_import_time():
+    '''Check the best time to import the lexer over a few runs, after modules loaded by Pygments and MkDocs.'''
+
+    best = None
+    for _ in range(5):
+        for line in _run_python("import logging, pygments.lexer; import lexer", "-X", "importtime"):
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if name.strip() == "lexer":
+                elapsed = int(cumulative) / 1000
+                if best == None or elapsed < best:
+                    best = elapsed
+
+    assert best != None
+    assert best <= MAX_IMPORT_MS, f"Importing the Bicep lexer took {best:.2f} ms, which is more than {MAX_IMPORT_MS} ms."
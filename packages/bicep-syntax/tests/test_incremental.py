@@ -0,0 +1,122 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# Tests that incremental lexing after edits and streaming from chunks produce the same tokens as lexing the whole text.
+
+import glob
+import os
+import random
+
+from lexer import BicepLexer, IncrementalLexer, stream_tokens
+
+DOCS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "docs")
+
+# Text inserted by random edits that changes the state of the lexer, such as opening strings, comments, and interpolation.
+SNIPPETS = ["'", "'''", "/*", "*/", "//", "${", "}", "{", "\n", "\r\n", "@description('x')\n", "var a = 1\n", " ", "é"]
+
+def _examples() -> list[str]:
+    '''Get the content of each Bicep example in the docs.'''
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(DOCS_DIR, "examples", "**", "*.bicep"), recursive = True)):
+        with open(path, encoding = "utf-8-sig") as f:
+            texts.append(f.read())
+
+    return texts
+
+def _lex(text: str) -> list[tuple]:
+    '''Lex the whole text.'''
+
+    return list(BicepLexer(cache = False).get_tokens_unprocessed(text))
+
+def _random_text(rng: random.Random, texts: list[str]) -> str:
+    '''Get a snippet or a fragment of an example to insert.'''
+
+    if rng.random() < 0.5:
+        return rng.choice(SNIPPETS)
+
+    text = rng.choice(texts)
+    start = rng.randrange(len(text))
+    return text[start:start + rng.randrange(1, 200)]
+
+def test_incremental_edits():
+    texts = _examples()
+    rng = random.Random(20261)
+    for _ in range(30):
+        document = IncrementalLexer(rng.choice(texts))
+        for _ in range(40):
+            text = document.text
+            start = rng.randrange(len(text) + 1)
+            end = min(len(text), start + rng.choice([0, 0, 1, 5, 50, 500]))
+            document.update(start, end, _random_text(rng, texts) if rng.random() < 0.8 else "")
+
+            expected = _lex(document.text)
+            assert document.tokens == expected
+
+            # Tokens for a range of lines are a contiguous run of the tokens for the whole document.
+            start = rng.randrange(len(document.text) + 1)
+            tokens = list(document.get_tokens(start, start + 100))
+            if len(tokens) > 0:
+                i = expected.index(tokens[0])
+                assert tokens == expected[i:i + len(tokens)]
+
+def test_incremental_empty():
+    document = IncrementalLexer()
+    assert document.tokens == []
+
+    document.update(0, 0, "param name string\n")
+    assert document.tokens == _lex("param name string\n")
+
+    document.update(0, len(document.text), "")
+    assert document.tokens == _lex("")
+
+def test_stream_chunks():
+    texts = _examples()
+    rng = random.Random(20262)
+    for text in texts:
+        chunks = []
+        pos = 0
+        while pos < len(text):
+            size = rng.choice([1, 2, 7, 64, 1000])
+            chunks.append(text[pos:pos + size])
+            pos += size
+
+        assert list(stream_tokens(chunks)) == _lex(text)
+
+def test_stream_edge_cases():
+    for text in ["", "\n", "\n\n\n", "'unterminated\n'\n", "/* open\ncomment\n", "var x = '${\n'\n", "a\r\nb\r\n"]:
+        for size in range(1, 4):
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            assert list(stream_tokens(chunks)) == _lex(text)
+
+def test_stream_file(tmp_path):
+    text = "".join(_examples())
+    path = tmp_path / "main.bicep"
+    path.write_text(text, encoding = "utf-8")
+
+    assert list(stream_tokens(str(path), chunk_size = 4096)) == _lex(path.read_text(encoding = "utf-8"))
+
+def test_stream_single_line():
+    '''Check a template without new lines is streamed with a bounded buffer.'''
+
+    # Lines with comments are left out, since a comment would continue to the end of the template.
+    lines = [line for text in _examples() for line in text.splitlines() if "//" not in line]
+    text = " ".join(lines)
+    chunk_size = 1000
+    lookahead = 4096
+    read = 0
+
+    def chunks():
+        nonlocal read
+        for pos in range(0, len(text), chunk_size):
+            read = pos + chunk_size
+            yield text[pos:read]
+
+    tokens = []
+    for token in stream_tokens(chunks(), lookahead = lookahead):
+        assert read - token[0] <= lookahead + 2 * chunk_size or read >= len(text)
+        tokens.append(token)
+
+    assert len(text) > 10 * lookahead
+    assert tokens == _lex(text)
@@ -0,0 +1,95 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+
+# NOTES:
+# Tests that the merged pattern scanner produces the same tokens as the pygments RegexLexer for the same rules.
+
+import glob
+import os
+import random
+import re
+
+import pytest
+
+import lexer
+
+from lexer import BicepLexer
+
+DOCS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "docs")
+
+# Bicep code fences in markdown pages.
+BICEP_FENCE = re.compile(r"^```bicep[^\n]*\n(.*?)^```", flags = re.M | re.S)
+
+def _examples() -> list[str]:
+    '''Get the path of each Bicep example in the docs.'''
+
+    return sorted(glob.glob(os.path.join(DOCS_DIR, "examples", "**", "*.bicep"), recursive = True))
+
+def _fences() -> list[str]:
+    '''Get the content of each Bicep code fence in the docs.'''
+
+    fences = []
+    for path in sorted(glob.glob(os.path.join(DOCS_DIR, "**", "*.md"), recursive = True)):
+        with open(path, encoding = "utf-8-sig") as f:
+            fences.extend(BICEP_FENCE.findall(f.read()))
+
+    return fences
+
+def _read(path: str) -> str:
+    with open(path, encoding = "utf-8-sig") as f:
+        return f.read()
+
+def _assert_same_tokens(text: str):
+    '''Check the fast lexer produces the same tokens as the regex lexer.'''
+
+    expected = list(BicepLexer(cache = False, fast = False).get_tokens_unprocessed(text))
+    actual = list(BicepLexer(cache = False).get_tokens_unprocessed(text))
+    assert actual == expected
+
+def test_examples_found():
+    assert len(_examples()) > 0
+    assert len(_fences()) > 0
+
+@pytest.mark.parametrize("path", _examples(), ids = lambda path: os.path.relpath(path, DOCS_DIR))
+def test_example(path: str):
+    _assert_same_tokens(_read(path))
+
+def test_fences():
+    for text in _fences():
+        _assert_same_tokens(text)
+
+def test_random_fragments():
+    '''Check fragments that start and end at any position, including inside strings, comments, and interpolation.'''
+
+    texts = [_read(path) for path in _examples()]
+    rng = random.Random(20260)
+    for _ in range(20000):
+        text = rng.choice(texts)
+        start = rng.randrange(len(text))
+        end = rng.randrange(start, min(len(text), start + 400) + 1)
+        _assert_same_tokens(text[start:end])
+
+def test_special_cases():
+    for text in ["", "\n", "'unterminated", "/* unterminated", "${", "@@@\n###", "var x = '${'${1}'}'\n", "\t \r\n é"]:
+        _assert_same_tokens(text)
+
+def test_groups_from_rules():
+    '''Check every callback in the rules is emitted from the merged match instead of matching the rule again.'''
+
+    for state, (_, rules) in BicepLexer._get_merged().items():
+        for rule in rules[1:]:
+            if rule != None:
+                assert not callable(rule[0]), state
+
+def test_unsupported_pygments(monkeypatch):
+    '''Check the standard RegexLexer is used when the version of pygments is not supported.'''
+
+    monkeypatch.setattr(lexer, "PYGMENTS_VERSIONS", ((0, 0), (1, 0)))
+    monkeypatch.setattr(BicepLexer, "_merged", None)
+
+    text = _read(_examples()[0])
+    expected = list(BicepLexer(cache = False, fast = False).get_tokens_unprocessed(text))
+    assert list(BicepLexer(cache = False).get_tokens_unprocessed(text)) == expected
+    assert list(lexer.IncrementalLexer(text).get_tokens()) == expected
+    assert list(lexer.stream_tokens([text[:100], text[100:]])) == expected
+    assert BicepLexer._merged == {}